@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+# In-process read-through cache for the public GET routes.
+# Every entry is keyed by the current version of each collection it was built
+# from, so an admin write only has to bump that collection's version and every
+# dependent entry becomes unreachable (and is later evicted by TTL / LRU).
+# Versions are per process; app.services.cache_sync carries every bump to the
+# other workers.
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+
+
+class ResponseCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._versions: dict[str, int] = {}
+        self._loading: dict = {}  # key -> asyncio.Lock, so a cold key is loaded once
+        self._listeners = []  # called with the invalidated collection names
+        self._unpublished: set = set()  # bumped here, not yet shared with other workers
+        # random per-process epoch: versions never repeat across restarts
+        self._epoch = uuid.uuid4().hex[:8]
+
+    def version(self, collection: str) -> str:
+        return f"{self._epoch}.{self._versions.get(collection, 0)}"
+
+    def versions(self, collections) -> tuple:
+        return tuple(self.version(c) for c in collections)
+
+    def invalidate(self, *collections: str, publish: bool = True):
+        for c in collections:
+            self._versions[c] = self._versions.get(c, 0) + 1
+        if publish:
+            self._unpublished.update(collections)
+        for listener in self._listeners:
+            listener(collections)
+
+    def take_unpublished(self) -> set:
+        names, self._unpublished = self._unpublished, set()
+        return names
+
+    def requeue_unpublished(self, names):
+        self._unpublished.update(names)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, collections, key, loader):
+        collections = tuple(collections)
+        cache_key = (key, self.versions(collections))
+
+        entry = self._get(cache_key)
+        if entry:
+            return entry[1]
+
+        lock = self._loading.setdefault(cache_key, asyncio.Lock())
+        try:
+            async with lock:
+                entry = self._get(cache_key)
+                if entry:
+                    return entry[1]
+
+                value = await loader()
+                # a write landed while we were loading -> don't keep the old data
+                if self.versions(collections) == cache_key[1]:
+                    self._set(cache_key, value)
+                return value
+        finally:
+            # a later caller may already have installed a new lock for this key
+            if self._loading.get(cache_key) is lock:
+                del self._loading[cache_key]
+
+    def clear(self):
+        self._entries.clear()
+
+
+cache = ResponseCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+
+async def cached(collections, key, loader):
+    """Return the cached value for key, calling loader() on a miss."""
+    return await cache.get_or_load(collections, key, loader)
+
+
+def invalidate(*collections: str):
+    """Call after every admin write to the given collections."""
+    cache.invalidate(*collections)
@@ -0,0 +1,96 @@
+import hashlib
+import orjson
+from bson import ObjectId
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.core.cache import cached
+from app.core.compression import MIN_COMPRESS_SIZE, SUPPORTED_ENCODINGS, compress, negotiate_encoding
+
+# Shared response layer for the public GET routes.
+# - Bodies are rendered to bytes once with orjson and cached, so a cache hit
+#   skips both Mongo and serialization.
+# - gzip / brotli variants are compressed once per content version and picked
+#   per request from Accept-Encoding.
+# - The ETag is a hash of the rendered body, computed once per content
+#   version, so every worker hands out the same ETag for the same bytes and
+#   a matching If-None-Match is answered with 304 from the cached body.
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson; pre-rendered bytes are sent as-is."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def etag_for(digest: str, encoding: str | None) -> str:
+    # one strong ETag per representation (identity / gzip / br)
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in candidates
+
+
+def _compress_variants(body: bytes) -> dict:
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    return {encoding: compress(body, encoding) for encoding in SUPPORTED_ENCODINGS}
+
+
+async def cached_body(collections, key, loader, headers_for=None) -> tuple[bytes, dict, dict, str]:
+    """
+    Rendered (body, extra_headers, compressed_variants, digest) for key,
+    loading, serializing and compressing on a miss - i.e. once per content version.
+    """
+
+    async def render():
+        data = await loader()
+        body = dumps(data)
+        variants = await run_in_threadpool(_compress_variants, body)
+        digest = hashlib.sha1(body).hexdigest()[:24]
+        # e.g. pagination cursors derived from the payload
+        return body, (headers_for(data) if headers_for else {}), variants, digest
+
+    return await cached(collections, ("body", key), render)
+
+
+async def cached_response(request: Request, collections, key, loader, headers_for=None) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    body, extra_headers, variants, digest = await cached_body(collections, key, loader, headers_for)
+    if encoding not in variants:
+        encoding = None
+
+    headers = {
+        "ETag": etag_for(digest, encoding),
+        "Cache-Control": "no-cache",  # always revalidate, 304 is cheap
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        body = variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return FastJSONResponse(body, headers={**headers, **extra_headers})
@@ -0,0 +1,97 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from app.core.compression import compress, negotiate_encoding, MIN_COMPRESS_SIZE
+
+# /static mount that
+# - serves text files (aboutme.md, json, svg, ...) compressed. Each
+#   (file, mtime, size, encoding) is compressed once and kept in a small LRU,
+#   binary files (images) are passed through untouched.
+# - marks content-addressed uploads (<sha256>[-<width>].<ext>) as immutable,
+#   their bytes can never change so browsers / CDNs never need to revalidate.
+
+COMPRESSIBLE_EXTENSIONS = {".md", ".txt", ".json", ".csv", ".html", ".css", ".js", ".svg", ".xml"}
+MAX_COMPRESS_FILE_SIZE = 2 * 1024 * 1024
+MAX_CACHED_FILES = 128
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(-\d+)?\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def is_content_addressed(path: str) -> bool:
+    return bool(HASHED_NAME.match(os.path.basename(path)))
+
+
+class CompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compressed: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # compression runs in the threadpool
+
+    def _compressed_body(self, path, stat_result, encoding) -> bytes:
+        key = (path, stat_result.st_mtime_ns, stat_result.st_size, encoding)
+        with self._lock:
+            body = self._compressed.get(key)
+            if body is not None:
+                self._compressed.move_to_end(key)
+                return body
+
+        with open(path, "rb") as f:
+            body = compress(f.read(), encoding)
+
+        with self._lock:
+            self._compressed[key] = body
+            while len(self._compressed) > MAX_CACHED_FILES:
+                self._compressed.popitem(last=False)
+        return body
+
+    async def get_response(self, path, scope):
+        response = await self._get_response(path, scope)
+        if response.status_code in (200, 304) and is_content_addressed(path):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    async def _get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+
+        if (
+            response.status_code not in (200, 304)
+            or os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS
+        ):
+            return response
+        # identity and compressed bodies share the url, so every response says
+        # so - otherwise a shared cache may hand a stored identity body to everyone
+        response.headers["Vary"] = "Accept-Encoding"
+
+        if response.status_code == 304:
+            # echo the ETag the client validated: W/ when it holds a compressed body
+            etag = response.headers.get("etag")
+            if etag and "W/" + etag in Headers(scope=scope).get("if-none-match", ""):
+                response.headers["ETag"] = "W/" + etag
+            return response
+
+        if not isinstance(response, FileResponse):
+            return response
+        stat_result = response.stat_result
+        if not MIN_COMPRESS_SIZE <= stat_result.st_size <= MAX_COMPRESS_FILE_SIZE:
+            return response
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if not encoding:
+            return response
+
+        body = await run_in_threadpool(self._compressed_body, response.path, stat_result, encoding)
+        headers = {
+            "Content-Encoding": encoding,
+            "Vary": "Accept-Encoding",
+            # weak: same file, different bytes. StaticFiles' 304 check ignores W/
+            "ETag": "W/" + response.headers["etag"],
+            "Last-Modified": response.headers["last-modified"],
+        }
+        return Response(body, headers=headers, media_type=response.media_type)
@@ -1,5 +1,6 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import CollectionInvalid, OperationFailure
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,6 +12,54 @@ client = AsyncIOMotorClient(MONGODB_URI)
 db = client[DB_NAME]
 
 
+async def find_public(collection, query=None, sort=None, projection=None, limit=None):
+    """
+    find() for public responses: the `_id` -> `id` string conversion is done by
+    Mongo in the same pipeline, so results can be serialized without a Python pass.
+    """
+    pipeline = [{"$match": query or {}}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit:
+        pipeline.append({"$limit": limit})
+
+    if projection:
+        pipeline.append({"$project": {**projection, "id": {"$toString": "$_id"}, "_id": 0}})
+    else:
+        pipeline.append({"$set": {"id": {"$toString": "$_id"}}})
+        pipeline.append({"$project": {"_id": 0}})
+
+    return await collection.aggregate(pipeline).to_list(None)
+
+
+_transactions: bool | None = None
+
+
+async def supports_transactions() -> bool:
+    """Transactions need a replica set or a sharded cluster (mongos), checked once."""
+    global _transactions
+    if _transactions is None:
+        try:
+            hello = await client.admin.command("hello")
+            _transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except Exception:
+            _transactions = False
+    return _transactions
+
+
+async def bulk_write(collection, ops: list) -> int:
+    """Unordered bulk_write, in a transaction when the deployment supports it."""
+    if not ops:
+        return 0
+    if await supports_transactions():
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                result = await collection.bulk_write(ops, ordered=False, session=session)
+    else:
+        result = await collection.bulk_write(ops, ordered=False)
+    return result.modified_count
+
+
 async def test_connection():
     try:
         await client.server_info()
@@ -23,11 +72,23 @@ async def create_indexes():
     # Projects
     await db.projects.create_index("category_id")
     await db.projects.create_index("enabled")
-    await db.projects.create_index("order")
+    # /api/projects/ keyset pagination + filters, all ending in the sort key
+    await db.projects.create_index([("category_id", 1), ("rank", 1), ("_id", 1)])
+    await db.projects.create_index([("enabled", 1), ("category_id", 1), ("rank", 1), ("_id", 1)])
+    await db.projects.create_index([("difficulty", 1), ("category_id", 1), ("rank", 1), ("_id", 1)])
+    await db.projects.create_index([("skills", 1), ("category_id", 1), ("rank", 1), ("_id", 1)])  # multikey
 
     # Project Categories
     await db.project_categories.create_index("enabled")
-    await db.project_categories.create_index("order")
+    await db.project_categories.create_index("rank")
+
+    # Skills / Timelines (rank = display order, see app/services/ranking.py)
+    await db.skills.create_index([("category", 1), ("rank", 1)])
+    await db.timelines.create_index("rank")
+
+    # Materialized categories-with-projects view
+    await db.project_category_views.create_index([("enabled", 1), ("rank", 1)])
+    await db.project_category_views.create_index("rank")
 
     # ✅ Profile (single-document but future-safe)
     await db.profile.create_index("_id")
@@ -36,6 +97,21 @@ async def create_indexes():
     
     await db.profile_stats.create_index("_id")
     await db.profile_stats.create_index("last_updated")
+    # trend data, one point per source refresh (time-series: compressed, bucketed by time)
+    if "profile_stats_history" not in await db.list_collection_names():
+        try:
+            await db.create_collection(
+                "profile_stats_history",
+                timeseries={"timeField": "ts", "metaField": "source", "granularity": "hours"},
+            )
+        except CollectionInvalid:
+            pass  # another worker starting up created it first
+        except OperationFailure as e:
+            if e.code != 48:  # NamespaceExists
+                raise
+    # one document per contest, the unique key keeps concurrent syncs from duplicating
+    await db.codeforces_rating_history.create_index([("handle", 1), ("contestId", 1)], unique=True)
+    await db.codeforces_rating_history.create_index([("handle", 1), ("ratingUpdateTimeSeconds", 1)])
     # Chat sessions
     # await db.chat_sessions.create_index("_id", unique=True)
 
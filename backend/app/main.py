@@ -1,6 +1,8 @@
 from fastapi import FastAPI
-from app.database import test_connection, create_indexes
+from app.database import db, test_connection, create_indexes
+from app.services import cache_sync, category_view, chat_sessions, images, llm_gemini, ranking, profile_stats_fetcher, stats_refresher
 from contextlib import asynccontextmanager
+import asyncio
 
 #Fetch FRONTEND_URL from env
 import os
@@ -18,6 +20,8 @@ from app.routes.project_categories import admin_router as project_categories_adm
 from app.routes.projects import public_router as projects_public
 from app.routes.projects import admin_router as projects_admin
 from app.routes.chat import router as chat_router
+from app.routes.portfolio import public_router as portfolio_public
+from app.routes.backup import admin_router as backup_admin
 
 # ✅ NEW profile routers
 from app.routes.profile_image import public_router as profile_image_public
@@ -28,7 +32,7 @@ from app.routes.profile_embeddings import admin_router as profile_embeddings_adm
 from app.routes.profile_data import public_router as profile_data_public
 from app.routes.profile_data import admin_router as profile_data_admin
 from app.routes.profile_stats import router as profile_stats_router
-from fastapi.staticfiles import StaticFiles
+from app.core.static_files import CompressedStaticFiles
 
 from app.routes.auth import router as auth_router
 
@@ -37,7 +41,35 @@ from app.routes.auth import router as auth_router
 async def lifespan(app: FastAPI):
     await test_connection()
     await create_indexes()   
+    # migrate integer `order` to rank keys (no-op once done)
+    await ranking.ensure_ranks(db.skills, "category")
+    await ranking.ensure_ranks(db.projects, "category_id")
+    await ranking.ensure_ranks(db.timelines)
+    await ranking.ensure_ranks(db.project_categories)
+    await category_view.rebuild_all()
+    cache_syncer = asyncio.create_task(cache_sync.run_sync())
+    scheduler = None
+    if stats_refresher.SCHEDULER_ENABLED:
+        scheduler = asyncio.create_task(stats_refresher.run_scheduler())
+    chat_flusher = None
+    if chat_sessions.WRITE_BEHIND:
+        chat_flusher = asyncio.create_task(chat_sessions.run_flusher())
     yield #giving the control back to fastAPI
+    for task in (cache_syncer, scheduler, chat_flusher):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    await chat_sessions.flush()  # write-behind buffer
+    try:
+        await cache_sync.publish()  # last bumps, for the workers still running
+    except Exception as e:
+        print("Cache sync error:", e)
+    images.shutdown_pool()
+    llm_gemini.shutdown_executor()
+    await profile_stats_fetcher.close_client()
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware( # Add CORS or other middleware if needed
@@ -46,6 +78,7 @@ app.add_middleware( # Add CORS or other middleware if needed
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 app.include_router(auth_router)
 app.include_router(skills_admin)
@@ -56,6 +89,8 @@ app.include_router(project_categories_public)
 app.include_router(project_categories_admin)
 app.include_router(projects_public)
 app.include_router(projects_admin)
+app.include_router(portfolio_public) # single bootstrap document for the landing page
+app.include_router(backup_admin) # NDJSON data + static tar export / import
 app.include_router(chat_router) # CHAT ROUTER IS WEBSOCKET. Will be masked with security later
 
 # ✅ Profile Routers
@@ -68,7 +103,7 @@ app.include_router(profile_data_public)
 app.include_router(profile_data_admin)
 app.include_router(profile_stats_router) # Profile stats need a GET api only so keep it as is
 # Static files (profile images, aboutme.md, embeddings)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CompressedStaticFiles(directory="static"), name="static")
 
 
 @app.get("/")
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class BulkChange(BaseModel):
+    id: str
+    order: Optional[int] = Field(None, ge=1)  # new 1-based position, None = keep / append
+    category: Optional[str] = None  # skills: category name, projects: category_id
@@ -13,6 +13,7 @@ class ProjectBase(BaseModel):
     skills: List[str] = []
     enabled: bool = True
     image_link: Optional[str] = None
+    image_variants: dict = {}  # resized webp / avif, generated at upload
 
 
 class ProjectCreate(ProjectBase):
@@ -7,6 +7,7 @@ class ProjectCategoryBase(BaseModel):
     order: int = 0
     enabled: bool = True
     image_link: Optional[str] = None
+    image_variants: dict = {}  # resized webp / avif, generated at upload
 
 
 class ProjectCategoryCreate(ProjectCategoryBase):
@@ -15,6 +15,7 @@ class SkillBase(BaseModel):
     order: int
     hover_color_primary: str
     hover_color_secondary: Optional[str] = None
+    logo_variants: dict = {}  # resized webp / avif, generated at upload
 
 # NOTE:
 # SkillCreate / SkillUpdate are NOT used directly in routes
@@ -8,6 +8,7 @@ class TimelineBase(BaseModel):
     description: str
     order: int
     logo_path: str
+    logo_variants: dict = {}  # resized webp / avif, generated at upload
 
 
 class TimelineCreate(BaseModel):
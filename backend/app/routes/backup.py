@@ -0,0 +1,291 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from bson import json_util
+from pymongo import ReplaceOne
+from datetime import datetime, timezone
+import asyncio, io, os, queue, tarfile, threading
+from app.database import db
+from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.services import category_view, ranking, storage, vector_index
+
+# Backup / restore of the whole portfolio.
+# - data: NDJSON, one {"collection": ..., "doc": ...} line per document in
+#   MongoDB extended JSON (ObjectIds / dates survive the round trip). Streamed
+#   straight from the cursors, so memory stays flat whatever the size.
+# - files: everything under static/ (uploads, profile image, aboutme.md,
+#   embeddings) as a tar stream, built in a worker thread.
+# Admin credentials, chat sessions and derived collections (views) are not exported.
+# Imports are validated in full before anything is written or deleted.
+
+admin_router = APIRouter(prefix="/api/backup", tags=["backup"], dependencies=[Depends(get_current_admin)])
+
+BACKUP_COLLECTIONS = (
+    "skills",
+    "timelines",
+    "project_categories",
+    "projects",
+    "profile",
+    "profile_stats",
+    "static_files",  # upload reference counts, keeps the static tar consistent
+    "profile_stats_history",  # trend data, can't be fetched again
+    "codeforces_rating_history",
+)
+# time-series: no upserts by _id, points are only inserted (existing _ids skipped)
+TIME_SERIES_COLLECTIONS = ("profile_stats_history",)
+# restored by their natural key, the unique index would reject a differing _id
+UPSERT_KEYS = {"codeforces_rating_history": ("handle", "contestId")}
+# cache names the collections are read under
+CACHE_NAMES = {"profile_stats_history": "profile_stats", "codeforces_rating_history": "profile_stats"}
+STATIC_CACHE_NAMES = ("aboutme", "profile", "embeddings")
+STATIC_DIR = "static"
+BATCH_SIZE = 500
+FLUSH_BYTES = 64 * 1024
+TAR_QUEUE_SIZE = 8  # chunks of storage.CHUNK_SIZE in flight at most
+MAX_BACKUP_SIZE = int(os.getenv("MAX_BACKUP_UPLOAD_MB", "2048")) * storage.MB
+
+
+def _attachment(name: str, ext: str) -> dict:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return {"Content-Disposition": f'attachment; filename="{name}-{stamp}.{ext}"'}
+
+
+# ---------------------------
+# Data (NDJSON)
+# ---------------------------
+
+async def export_lines():
+    buffer = []
+    size = 0
+    for name in BACKUP_COLLECTIONS:
+        async for doc in db[name].find({}).batch_size(BATCH_SIZE):
+            line = json_util.dumps({"collection": name, "doc": doc}) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= FLUSH_BYTES:
+                yield "".join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+async def read_lines(file: UploadFile):
+    pending = b""
+    while chunk := await file.read(storage.CHUNK_SIZE):
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def parse_line(line: bytes) -> tuple[str, dict]:
+    try:
+        record = json_util.loads(line)
+        name, doc = record["collection"], record["doc"]
+    except Exception:
+        raise HTTPException(400, "Invalid NDJSON line")
+    if name not in BACKUP_COLLECTIONS:
+        raise HTTPException(400, f"Unknown collection: {name}")
+    if not isinstance(doc, dict) or "_id" not in doc:
+        raise HTTPException(400, f"Document without _id in {name}")
+    return name, doc
+
+
+class _Importer:
+    """
+    Batches documents per collection. replace=True empties each collection on
+    first sight, so the whole file is validated before an importer is used.
+    """
+
+    def __init__(self, replace: bool):
+        self.replace = replace
+        self.batches = {}
+        self.counts = {}
+
+    async def add(self, name: str, doc: dict):
+        if name not in self.batches:
+            if self.replace:
+                await db[name].delete_many({})
+            self.batches[name] = []
+            self.counts[name] = 0
+
+        self.batches[name].append(doc)
+        if len(self.batches[name]) >= BATCH_SIZE:
+            await self.flush(name)
+
+    async def flush(self, name: str):
+        docs, self.batches[name] = self.batches[name], []
+        if not docs:
+            return
+        if self.replace:
+            await db[name].insert_many(docs, ordered=False)
+        elif name in TIME_SERIES_COLLECTIONS:
+            existing = {d["_id"] async for d in db[name].find({"_id": {"$in": [d["_id"] for d in docs]}}, {"_id": 1})}
+            docs = [d for d in docs if d["_id"] not in existing]
+            if docs:
+                await db[name].insert_many(docs, ordered=False)
+        elif name in UPSERT_KEYS:
+            keys = UPSERT_KEYS[name]
+            await db[name].bulk_write([
+                ReplaceOne({k: d.get(k) for k in keys}, {k: v for k, v in d.items() if k != "_id"}, upsert=True)
+                for d in docs
+            ], ordered=False)
+        else:
+            # upsert by _id, so importing the same file twice is harmless
+            await db[name].bulk_write(
+                [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False
+            )
+        self.counts[name] += len(docs)
+
+    async def finish(self) -> dict:
+        for name in self.batches:
+            await self.flush(name)
+        return self.counts
+
+
+@admin_router.get("/data")
+async def export_data():
+    return StreamingResponse(
+        export_lines(),
+        media_type="application/x-ndjson",
+        headers=_attachment("portfolio", "ndjson"),
+    )
+
+
+async def _refresh_derived(counts: dict):
+    await ranking.ensure_ranks(db.skills, "category")
+    await ranking.ensure_ranks(db.projects, "category_id")
+    await ranking.ensure_ranks(db.timelines)
+    await ranking.ensure_ranks(db.project_categories)
+    await category_view.rebuild_all()
+    invalidate(*{CACHE_NAMES.get(name, name) for name in counts})
+
+
+@admin_router.post("/data")
+async def import_data(
+    file: UploadFile = File(...),
+    replace: bool = Query(False),  # wipe the imported collections first (clone an environment)
+):
+    # first pass: nothing is written (or deleted) unless every line is valid
+    async for line in read_lines(file):
+        parse_line(line)
+    await file.seek(0)
+
+    importer = _Importer(replace)
+    try:
+        async for line in read_lines(file):
+            await importer.add(*parse_line(line))
+        counts = await importer.finish()
+    except BaseException:
+        # whatever made it in has to be visible, without hiding the original error
+        try:
+            await _refresh_derived(importer.counts)
+        except Exception as e:
+            print("Backup import: refresh after a failed import failed:", e)
+        raise
+    await _refresh_derived(counts)
+
+    return {"message": "Import complete", "imported": counts}
+
+
+# ---------------------------
+# Files (tar)
+# ---------------------------
+
+class _QueueWriter(io.RawIOBase):
+    """File object handing written bytes to the event loop through a bounded queue."""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        _put(self.chunks, bytes(b), self.cancelled)
+        return len(b)
+
+
+def _put(chunks: queue.Queue, item, cancelled: threading.Event):
+    # blocks while the client is slow (backpressure), gives up once it's gone
+    while True:
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            if cancelled.is_set():
+                raise OSError("Download cancelled")
+
+
+def _write_tar(chunks: queue.Queue, cancelled: threading.Event):
+    try:
+        with io.BufferedWriter(_QueueWriter(chunks, cancelled), buffer_size=storage.CHUNK_SIZE) as out:
+            with tarfile.open(fileobj=out, mode="w|") as tar:
+                for dirpath, dirnames, filenames in os.walk(STATIC_DIR):
+                    dirnames.sort()
+                    for name in sorted(filenames):
+                        if name.endswith(".tmp"):  # uploads in progress
+                            continue
+                        path = os.path.join(dirpath, name)
+                        tar.add(path, arcname=os.path.relpath(path, STATIC_DIR))
+        _put(chunks, None, cancelled)
+    except Exception as e:
+        if not cancelled.is_set():
+            _put(chunks, e, cancelled)
+
+
+async def export_files():
+    chunks = queue.Queue(maxsize=TAR_QUEUE_SIZE)
+    cancelled = threading.Event()
+    producer = asyncio.get_running_loop().run_in_executor(None, _write_tar, chunks, cancelled)
+    try:
+        while True:
+            item = await run_in_threadpool(chunks.get)
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        while not producer.done():  # unblock a producer waiting on a full queue
+            try:
+                chunks.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.05)
+
+
+def _extract(path: str):
+    with tarfile.open(path, mode="r:*") as tar:
+        # "data" filter: no absolute paths, no escaping STATIC_DIR, no devices / links out
+        tar.extractall(STATIC_DIR, filter="data")
+
+
+@admin_router.get("/files")
+async def export_static_files():
+    return StreamingResponse(
+        export_files(),
+        media_type="application/x-tar",
+        headers=_attachment("portfolio-static", "tar"),
+    )
+
+
+@admin_router.post("/files")
+async def import_static_files(file: UploadFile = File(...)):
+    tmp_path, _ = await storage.stream_to_temp(file, STATIC_DIR, MAX_BACKUP_SIZE)
+    try:
+        await run_in_threadpool(_extract, tmp_path)
+    except tarfile.TarError:
+        raise HTTPException(400, "Invalid tar archive")
+    finally:
+        await run_in_threadpool(os.remove, tmp_path)
+
+    # restored aboutme.md / embeddings are served right away, not after a TTL / poll
+    await vector_index.reload()
+    invalidate(*STATIC_CACHE_NAMES)
+    return {"message": "Static files imported"}
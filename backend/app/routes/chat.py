@@ -1,13 +1,75 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from datetime import datetime
-from app.database import db
-from app.services.llm_gemini import stream_gemini_response
+import asyncio, time
+from app.services import answer_cache, chat_sessions, vector_index
+from app.services.llm_gemini import astream_gemini_response
 
 router = APIRouter(prefix="/chat", tags=["Chatbot"])
 
+# Tokens are coalesced into one frame per window (or byte budget) instead of
+# one websocket frame per Gemini delta.
+# Framing: ?framing=text (default) sends raw text frames and a literal "__END__",
+# ?framing=json sends {"type": "start" | "delta" | "end" | "error", ...} envelopes.
+COALESCE_WINDOW_SECONDS = 0.04
+COALESCE_MAX_BYTES = 1024
+
+
+async def coalesce(events, window: float = COALESCE_WINDOW_SECONDS, max_bytes: int = COALESCE_MAX_BYTES):
+    """
+    Merge consecutive ("token", text) events: a batch is flushed once it's
+    `window` old or `max_bytes` long, whichever comes first. Other events pass
+    through (after flushing what's pending, so order is kept).
+    """
+    buffer, size, deadline = [], 0, None
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            timeout = None if deadline is None else max(0, deadline - time.monotonic())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if not done:  # window over, nothing new yet
+                yield ("token", "".join(buffer))
+                buffer, size, deadline = [], 0, None
+                continue
+
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if event[0] == "token":
+                buffer.append(event[1])
+                size += len(event[1].encode())
+                deadline = deadline or time.monotonic() + window
+                if size >= max_bytes:
+                    yield ("token", "".join(buffer))
+                    buffer, size, deadline = [], 0, None
+                continue
+
+            if buffer:
+                yield ("token", "".join(buffer))
+                buffer, size, deadline = [], 0, None
+            yield event
+
+        if buffer:
+            yield ("token", "".join(buffer))
+    finally:
+        if pending is not None:  # stopped early: cancel the read in flight first
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        await events.aclose()
+
 
 @router.websocket("/ws")
 async def chat_ws(websocket: WebSocket):
+    json_framing = websocket.query_params.get("framing") == "json"
+    sessions = {}  # chat_id -> {"interaction_id", "recent"}, see chat_sessions.get_session
     await websocket.accept()
 
     try:
@@ -24,54 +86,68 @@ async def chat_ws(websocket: WebSocket):
             chat_id = data["chatId"]
             user_message = data["message"]
 
-            # Load existing session
-            session = await db.chat_sessions.find_one({"_id": chat_id}) or {}
-            previous_interaction_id = session.get("gemini_chat_id")
+            # Session state is looked up once per connection, then kept here
+            if chat_id not in sessions:
+                sessions[chat_id] = await chat_sessions.get_session(chat_id)
+            session = sessions[chat_id]
+            previous_interaction_id = session["interaction_id"]
+            first_turn = not session["recent"]
 
-            # Append user message
-            history = session.get("chatHistory", [])
-            history.append({
-                "role": "user",
-                "message": user_message,
-                "timestamp": datetime.utcnow()
-            })
+            user_entry = chat_sessions.message("user", user_message)
 
             ai_response = ""
             new_interaction_id = None
 
-            # Stream from Gemini
-            for event in stream_gemini_response(user_message, previous_interaction_id):
-                if event[0] == "token":
-                    await websocket.send_text(event[1])
-                    ai_response += event[1]
-
-                elif event[0] == "done":
-                    new_interaction_id = event[1]
-
-            # Append AI message
-            history.append({
-                "role": "ai",
-                "message": ai_response,
-                "timestamp": datetime.utcnow()
-            })
-
-            # Keep only last 20 messages
-            history = history[-20:]
-
-            # Save session
-            await db.chat_sessions.update_one(
-                {"_id": chat_id},
-                {
-                    "$set": {
-                        "gemini_chat_id": new_interaction_id,
-                        "chatHistory": history,
-                        "updated_at": datetime.utcnow(),
-                    }
-                },
-                upsert=True,
-            )
-
-            await websocket.send_text("__END__")
+            if json_framing:
+                await websocket.send_json({"type": "start", "chatId": chat_id})
+
+            # First turns of common questions are replayed from the answer cache,
+            # everything else streams from Gemini (worker thread, the event loop stays free)
+            hit = answer_cache.lookup(user_message) if first_turn else None
+            if hit:
+                events = answer_cache.replay(hit)
+            else:
+                # ground the question on the closest profile passages (no-op without embeddings)
+                passages = await vector_index.retrieve(user_message)
+                # no interaction to continue (the last answer came from the cache):
+                # the new one starts from the recent messages instead
+                earlier = session["recent"] if previous_interaction_id is None else []
+                prompt = vector_index.build_prompt(user_message, passages, earlier)
+                events = astream_gemini_response(prompt, previous_interaction_id)
+
+            try:
+                async for event in coalesce(events):
+                    if event[0] == "token":
+                        if json_framing:
+                            await websocket.send_json({"type": "delta", "text": event[1]})
+                        else:
+                            await websocket.send_text(event[1])
+                        ai_response += event[1]
+
+                    elif event[0] == "done":
+                        new_interaction_id = event[1]
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                if not json_framing:
+                    raise
+                print("Chat stream error:", e)
+                await websocket.send_json({"type": "error", "message": "The assistant is unavailable right now"})
+                continue
+
+            if first_turn and not hit and new_interaction_id:
+                answer_cache.store(user_message, ai_response)
+
+            # Append both messages in one $push (history trimmed to 20 by Mongo)
+            exchange = [user_entry, chat_sessions.message("ai", ai_response)]
+            session["interaction_id"] = new_interaction_id
+            session["recent"] = (session["recent"] + exchange)[-chat_sessions.RECENT_MESSAGES:]
+            await chat_sessions.append_exchange(chat_id, exchange, new_interaction_id)
+
+            if json_framing:
+                await websocket.send_json({"type": "end", "cached": bool(hit)})
+            else:
+                await websocket.send_text("__END__")
 
     except WebSocketDisconnect:
         print("Chat disconnected")
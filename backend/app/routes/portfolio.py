@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Request
+import asyncio
+from app.core.cache import cache
+from app.core.responses import cached_body, cached_response, FastJSONResponse
+from app.routes.skills import load_skills
+from app.routes.timelines import load_timelines
+from app.routes.projects import load_projects
+from app.routes.project_categories import load_categories
+from app.routes.profile_data import load_profile_data
+from app.routes.profile_image import load_image
+from app.routes.profile_aboutme import load_aboutme
+from app.routes.profile_stats import load_profile_stats
+
+# One bootstrap document for the landing page instead of ~8 separate requests.
+# The snapshot is cached like every other public read and rebuilt in the
+# background right after an admin write, so visitors never pay for the rebuild.
+
+public_router = APIRouter(prefix="/api/portfolio", tags=["portfolio"], default_response_class=FastJSONResponse)
+
+PORTFOLIO_COLLECTIONS = (
+    "skills",
+    "timelines",
+    "projects",
+    "project_categories",
+    "profile",
+    "aboutme",
+    "profile_stats",
+)
+
+REBUILD_DELAY_SECONDS = 0.5  # coalesce bursts of admin writes into one rebuild
+
+_rebuild_task: asyncio.Task | None = None
+
+
+async def build_snapshot():
+    (
+        skills,
+        timelines,
+        projects,
+        categories,
+        profile_data,
+        profile_image,
+        aboutme,
+        profile_stats,
+    ) = await asyncio.gather(
+        load_skills(),
+        load_timelines(),
+        load_projects(),
+        load_categories(),
+        load_profile_data(),
+        load_image(),
+        load_aboutme(),
+        load_profile_stats(),
+    )
+
+    return {
+        "skills": skills,
+        "timelines": timelines,
+        "projects": projects,
+        "project_categories": categories,
+        "profile_data": profile_data,
+        "profile_image": profile_image,
+        "aboutme": aboutme["content"],
+        "profile_stats": profile_stats,
+    }
+
+
+async def get_snapshot():
+    return await cached_body(PORTFOLIO_COLLECTIONS, "portfolio", build_snapshot)
+
+
+async def _rebuild_later():
+    global _rebuild_task
+    await asyncio.sleep(REBUILD_DELAY_SECONDS)
+    _rebuild_task = None
+    try:
+        await get_snapshot()
+    except Exception as e:
+        print("Portfolio snapshot rebuild failed:", e)
+
+
+def _on_invalidate(collections):
+    global _rebuild_task
+    if _rebuild_task is not None or not set(collections) & set(PORTFOLIO_COLLECTIONS):
+        return
+    try:
+        _rebuild_task = asyncio.get_running_loop().create_task(_rebuild_later())
+    except RuntimeError:
+        pass  # invalidated outside the event loop, next read rebuilds it
+
+
+cache.add_listener(_on_invalidate)
+
+
+@public_router.get("")
+async def get_portfolio(request: Request):
+    return await cached_response(request, PORTFOLIO_COLLECTIONS, "portfolio", build_snapshot)
@@ -1,25 +1,96 @@
-from fastapi import APIRouter, HTTPException, Body, Depends
-import os
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+import os, time, uuid
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
 
-public_router = APIRouter(prefix="/profile/aboutme", tags=["Profile About Me"])
-admin_router = APIRouter(prefix="/profile/aboutme", tags=["Profile About Me"], dependencies=[Depends(get_current_admin)])
+try:
+    from markdown_it import MarkdownIt
+    # "html": False -> raw HTML in the markdown is escaped, so the output is safe to inject
+    _markdown = MarkdownIt("commonmark", {"html": False})
+except ImportError:  # optional, without it only the raw markdown is served
+    _markdown = None
+
+public_router = APIRouter(prefix="/profile/aboutme", tags=["Profile About Me"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/profile/aboutme", tags=["Profile About Me"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 
 ABOUT_PATH = "static/profile/aboutme.md"
+STAT_INTERVAL_SECONDS = 1.0  # how often the file is checked for outside edits
+
+# aboutme.md is held in memory (raw + rendered) and only re-read when the
+# file's (mtime, size) changes, so requests never touch the disk.
+_about = {"key": "unloaded", "content": "", "html": "", "checked_at": 0.0}
+
+
+def _stat_key():
+    try:
+        st = os.stat(ABOUT_PATH)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _render(content: str) -> str | None:
+    return _markdown.render(content) if _markdown else None
 
-@public_router.get("")
-async def get_aboutme():
-    if not os.path.exists(ABOUT_PATH):
-        return {"content": ""}
 
+def _read():
+    key = _stat_key()
+    if key is None:
+        return None, ""
     with open(ABOUT_PATH, "r", encoding="utf-8") as f:
-        return {"content": f.read()}
+        content = f.read()
+    return key, content
 
-@admin_router.put("")
-async def update_aboutme(content: str = Body(..., embed=True)):
-    os.makedirs(os.path.dirname(ABOUT_PATH), exist_ok=True)
 
-    with open(ABOUT_PATH, "w", encoding="utf-8") as f:
+def _write(content: str):
+    os.makedirs(os.path.dirname(ABOUT_PATH), exist_ok=True)
+    tmp_path = f"{ABOUT_PATH}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(content)
+    os.replace(tmp_path, ABOUT_PATH)  # readers never see a half-written file
+    return _stat_key()
+
+
+async def refresh_aboutme():
+    now = time.monotonic()
+    if now - _about["checked_at"] < STAT_INTERVAL_SECONDS:
+        return
+    _about["checked_at"] = now
+
+    key = await run_in_threadpool(_stat_key)
+    if key == _about["key"]:
+        return
+
+    key, content = await run_in_threadpool(_read)
+    html = await run_in_threadpool(_render, content)
+    _about.update(key=key, content=content, html=html)
+    invalidate("aboutme")
+
+
+async def load_aboutme():
+    await refresh_aboutme()
+    return {"content": _about["content"]}
+
+
+async def load_aboutme_html():
+    await refresh_aboutme()
+    return {"content": _about["content"], "html": _about["html"]}
+
+
+@public_router.get("")
+async def get_aboutme(request: Request, format: str = Query("markdown", pattern="^(markdown|html)$")):
+    await refresh_aboutme()
+    if format == "html":
+        return await cached_response(request, ["aboutme"], ("aboutme", "html"), load_aboutme_html)
+    return await cached_response(request, ["aboutme"], "aboutme", load_aboutme)
+
+@admin_router.put("")
+async def update_aboutme(content: str = Body(..., embed=True)):
+    key = await run_in_threadpool(_write, content)
+    html = await run_in_threadpool(_render, content)
+    _about.update(key=key, content=content, html=html, checked_at=time.monotonic())
+    invalidate("aboutme")
 
     return {"message": "aboutme.md updated"}
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from app.core.security import get_current_admin
 from app.database import db
 from app.models.profile_data import ProfileData
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
 
-public_router = APIRouter(prefix="/profile/data", tags=["Profile Data"])
-admin_router = APIRouter(prefix="/profile/data", tags=["Profile Data"], dependencies=[Depends(get_current_admin)])
-@public_router.get("")
-async def get_profile_data():
+public_router = APIRouter(prefix="/profile/data", tags=["Profile Data"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/profile/data", tags=["Profile Data"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
+async def load_profile_data():
     profile = await db.profile.find_one({"_id": "profile"})
     return profile.get("data") if profile else {}
 
+@public_router.get("")
+async def get_profile_data(request: Request):
+    return await cached_response(request, ["profile"], "profile_data", load_profile_data)
+
 @admin_router.put("")
 async def update_profile_data(data: ProfileData):
     await db.profile.update_one(
@@ -17,6 +22,7 @@ async def update_profile_data(data: ProfileData):
         {"$set": {"data": data.dict()}},
         upsert=True
     )
+    invalidate("profile")
     return {"message": "Profile data updated"}
 
 @admin_router.delete("")
@@ -25,4 +31,5 @@ async def delete_profile_data():
         {"_id": "profile"},
         {"$unset": {"data": ""}}
     )
+    invalidate("profile")
     return {"message": "Profile data deleted"}
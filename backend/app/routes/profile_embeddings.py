@@ -1,26 +1,66 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
 from app.core.security import get_current_admin
+from app.services import embedding_store, storage, vector_index
+from app.core.cache import invalidate
 import os
 
 admin_router = APIRouter(prefix="/profile/embeddings", tags=["Profile Embeddings"], dependencies=[Depends(get_current_admin)])
 
-EMBED_DIR = "static/profile/embeddings"
+EMBED_DIR = vector_index.EMBED_DIR
+
+def _convert(tmp_path: str, source_name: str, path: str, dtype: str):
+    embedding_store.write(embedding_store.read_records(tmp_path, source_name), path, dtype)
+    # the .emb replaces an earlier upload of the same name in the old formats
+    stem = os.path.splitext(path)[0]
+    for ext in (".json", ".jsonl"):
+        if os.path.exists(stem + ext):
+            os.remove(stem + ext)
 
 @admin_router.put("")
-async def upload_embeddings(file: UploadFile = File(...)):
-    os.makedirs(EMBED_DIR, exist_ok=True)
+async def upload_embeddings(
+    file: UploadFile = File(...),
+    dtype: str = Query("float32", pattern="^(float32|float16)$"),  # float16 halves the size
+):
+    """
+    .json / .jsonl ({"text", "embedding"} records) are converted to the binary
+    .emb format, .emb files are checked and stored as they are. Either way the
+    file is swapped in with a rename, running searches are not disturbed.
+    """
+    name = os.path.basename(file.filename or "")
+    stem, ext = os.path.splitext(name)
+    if not stem or ext not in vector_index.EXTENSIONS:
+        raise HTTPException(400, "Expected a .json, .jsonl or .emb file")
+
+    tmp_path, _ = await storage.stream_to_temp(file, EMBED_DIR, storage.MAX_EMBEDDINGS_SIZE)
+    path = os.path.join(EMBED_DIR, stem + embedding_store.EXTENSION)
+    try:
+        if ext == embedding_store.EXTENSION:
+            await run_in_threadpool(embedding_store.validate, tmp_path)
+            await run_in_threadpool(os.replace, tmp_path, path)
+        else:
+            await run_in_threadpool(_convert, tmp_path, name, path, dtype)
+    except (ValueError, KeyError, TypeError):  # bad JSON, missing fields, bad .emb
+        raise HTTPException(400, "Invalid embeddings file")
+    finally:
+        if os.path.exists(tmp_path):
+            await run_in_threadpool(os.remove, tmp_path)
 
-    path = os.path.join(EMBED_DIR, file.filename)
-    with open(path, "wb") as f:
-        f.write(await file.read())
+    await vector_index.reload()
+    invalidate("embeddings")  # cached chat answers were grounded on the old files
 
-    return {"message": "Embeddings uploaded", "path": path}
+    return {"message": "Embeddings uploaded", "path": path, "filename": os.path.basename(path)}
 
 @admin_router.delete("")
 async def delete_embeddings(filename: str):
-    path = os.path.join(EMBED_DIR, filename)
+    path = os.path.join(EMBED_DIR, os.path.basename(filename))
+    stem, ext = os.path.splitext(path)
+    if not os.path.exists(path) and ext in (".json", ".jsonl"):
+        path = stem + embedding_store.EXTENSION  # deleted by its uploaded name, stored converted
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="File not found")
 
     os.remove(path)
+    await vector_index.reload()
+    invalidate("embeddings")
     return {"message": "Embeddings deleted"}
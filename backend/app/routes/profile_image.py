@@ -1,37 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from app.database import db
-import os, uuid
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
+from app.services import storage
 
-public_router = APIRouter(prefix="/profile/image", tags=["Profile Image"])
-admin_router = APIRouter(prefix="/profile/image", tags=["Profile Image"], dependencies=[Depends(get_current_admin)])
+public_router = APIRouter(prefix="/profile/image", tags=["Profile Image"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/profile/image", tags=["Profile Image"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 IMAGE_DIR = "static/profile/image"
 
+
 @admin_router.put("")
 async def upload_or_update_image(file: UploadFile = File(...)):
-    os.makedirs(IMAGE_DIR, exist_ok=True)
-
-    ext = file.filename.split(".")[-1]
-    filename = f"profile_{uuid.uuid4()}.{ext}"
-    filepath = os.path.join(IMAGE_DIR, filename)
-
-    # delete old image if exists
-    profile = await db.profile.find_one({"_id": "profile"})
-    if profile and profile.get("image_url"):
-        old_path = profile["image_url"].replace("/", os.sep)
-        if os.path.exists(old_path):
-            os.remove(old_path)
-
-    with open(filepath, "wb") as f:
-        f.write(await file.read())
-
-    await db.profile.update_one(
-        {"_id": "profile"},
-        {"$set": {"image_url": filepath, "image_enabled": True}},
-        upsert=True
-    )
-
-    return {"image_url": filepath}
+    profile = await db.profile.find_one({"_id": "profile"}) or {}
+
+    # new image stored and saved first, the old one released after (a failed upload leaves it intact)
+    filepath, image_variants = await storage.store_image(file, IMAGE_DIR, IMAGE_DIR + "/")
+    try:
+        await db.profile.update_one(
+            {"_id": "profile"},
+            {"$set": {"image_url": filepath, "image_variants": image_variants, "image_enabled": True}},
+            upsert=True
+        )
+    except Exception:
+        await storage.release_image(filepath, image_variants)
+        raise
+    if profile.get("image_url"):
+        await storage.release_image(profile["image_url"], profile.get("image_variants"))
+    invalidate("profile")
+
+    return {"image_url": filepath, "image_variants": image_variants}
 
 @admin_router.delete("")
 async def delete_image():
@@ -39,21 +37,24 @@ async def delete_image():
     if not profile or not profile.get("image_url"):
         raise HTTPException(status_code=404, detail="No image found")
 
-    path = profile["image_url"].replace("/", os.sep)
-    if os.path.exists(path):
-        os.remove(path)
+    await storage.release_image(profile["image_url"], profile.get("image_variants"))
 
     await db.profile.update_one(
         {"_id": "profile"},
-        {"$unset": {"image_url": ""}}
+        {"$unset": {"image_url": "", "image_variants": ""}}
     )
+    invalidate("profile")
 
     return {"message": "Profile image removed"}
 
-@public_router.get("")
-async def get_image():
-    profile = await db.profile.find_one({"_id": "profile"})
+async def load_image():
+    profile = await db.profile.find_one({"_id": "profile"}) or {}
     return {
-        "image_url": profile.get("image_url") if profile else None,
+        "image_url": profile.get("image_url"),
+        "image_variants": profile.get("image_variants", {}),
         "enabled": profile.get("image_enabled", False)
     }
+
+@public_router.get("")
+async def get_image(request: Request):
+    return await cached_response(request, ["profile"], "profile_image", load_image)
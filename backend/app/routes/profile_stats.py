@@ -1,61 +1,117 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
 from app.database import db
-from app.services.profile_stats_fetcher import (
-    fetch_leetcode,
-    fetch_codeforces,
-    fetch_github,
-)
-from datetime import datetime
-
-router = APIRouter(prefix="/profile/stats", tags=["Profile Stats"])
-#doesnt have any post/patch/put/delete routes bcz its a read only data which is being updated by a routine job in background, so only get route is needed
-@router.get("")
-async def get_profile_stats():
+from datetime import datetime, timedelta, timezone
+import math
+from app.services import codeforces_history, stats_refresher
+from app.core.responses import cached_response, FastJSONResponse
+
+router = APIRouter(prefix="/profile/stats", tags=["Profile Stats"], default_response_class=FastJSONResponse)
+#doesnt have any post/patch/put/delete routes bcz its a read only data which is being updated by a routine job in background (app/services/stats_refresher.py), so only get route is needed
+async def load_profile_stats():
+    stats = await db.profile_stats.find_one({"_id": "stats"}) or {}
 
-    cached = await db.profile_stats.find_one({"_id": "stats"}) or {}
+    codeforces = stats.get("codeforces")
+    if codeforces and "ratingHistory" not in codeforces:
+        codeforces["ratingHistory"] = await codeforces_history.load_history(codeforces["username"])
 
     result = {
-        "leetcode": cached.get("leetcode"),
-        "codeforces": cached.get("codeforces"),
-        "github": cached.get("github"),
-        "last_updated": cached.get("last_updated"),
+        "leetcode": stats.get("leetcode"),
+        "codeforces": codeforces,
+        "github": stats.get("github"),
+        "last_updated": stats.get("last_updated"),
         "cached": True,
     }
 
     return result
 
-    updated = False
-
-async def refresh_profile_stats():
-    leetcode_username = "gkg11092002"
-    codeforces_username = "Gaurav_KG"
-    github_username = "CodingWeeb-Gaurav"
-    result = {}
-    try:
-        result["leetcode"] = fetch_leetcode(leetcode_username)
-    except Exception as e:
-        print("LeetCode error:", e)
-
-    try:
-        result["codeforces"] = fetch_codeforces(codeforces_username)
-    except Exception as e:
-        print("Codeforces error:", e)
-
-    try:
-        result["github"] = fetch_github(github_username)
-    except Exception as e:
-        print("GitHub error:", e)
-
-    
-    await db.profile_stats.update_one(
-        {"_id": "stats"},
-        {
-            "$set": {
-                **result,
-                "last_updated": datetime.utcnow(),
-            }
-        },
-        upsert=True,
-    )
-    #function returns nothing bcz its a routine job to save
 
+@router.get("")
+async def get_profile_stats(request: Request):
+    # stale-while-revalidate: answer from the db now, refresh outdated sources in the background
+    await stats_refresher.revalidate()
+    return await cached_response(request, ["profile_stats"], "profile_stats", load_profile_stats)
+
+
+# ---------------------------
+# History (trend graphs)
+# ---------------------------
+
+BUCKET_SECONDS = {
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+}
+MAX_POINTS = 200  # per source, whatever the range
+DEFAULT_HISTORY_DAYS = 365
+
+
+def _utc(value: datetime) -> datetime:
+    # stored timestamps are naive UTC
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def pick_bucket(span_seconds: float, bucket: str) -> tuple[str, int]:
+    """(unit, binSize) for $dateTrunc, coarsened until the range fits in MAX_POINTS buckets."""
+    if bucket == "auto":
+        bucket = next(
+            (u for u, sec in BUCKET_SECONDS.items() if span_seconds / sec <= MAX_POINTS),
+            "month",
+        )
+    bin_size = max(1, math.ceil(span_seconds / BUCKET_SECONDS[bucket] / MAX_POINTS))
+    return bucket, bin_size
+
+
+async def load_stats_history(start: datetime, end: datetime, unit: str, bin_size: int, source: str | None):
+    match = {"ts": {"$gte": start, "$lt": end}}
+    if source:
+        match["source"] = source
+
+    # last value per (source, bucket): the metrics are running totals / current ratings
+    rows = await db.profile_stats_history.aggregate([
+        {"$match": match},
+        {"$sort": {"ts": 1}},
+        {"$group": {
+            "_id": {
+                "source": "$source",
+                "t": {"$dateTrunc": {"date": "$ts", "unit": unit, "binSize": bin_size}},
+            },
+            "metrics": {"$last": "$metrics"},
+        }},
+        {"$sort": {"_id.t": 1}},
+    ]).to_list(None)
+
+    series = {}
+    for row in rows:
+        series.setdefault(row["_id"]["source"], []).append({"t": row["_id"]["t"], **row["metrics"]})
+
+    return {"from": start, "to": end, "bucket": unit, "binSize": bin_size, "series": series}
+
+
+@router.get("/history")
+async def get_profile_stats_history(
+    request: Request,
+    from_: datetime | None = Query(None, alias="from"),
+    to: datetime | None = Query(None),
+    bucket: str = Query("auto", pattern="^(auto|hour|day|week|month)$"),
+    source: str | None = Query(None),
+):
+    end = _utc(to) if to else datetime.utcnow()
+    start = _utc(from_) if from_ else end - timedelta(days=DEFAULT_HISTORY_DAYS)
+    if start >= end:
+        raise HTTPException(400, "`from` must be before `to`")
+    if source is not None and source not in stats_refresher.STATS_SOURCES:
+        raise HTTPException(400, "Unknown source")
+
+    unit, bin_size = pick_bucket((end - start).total_seconds(), bucket)
+
+    # keyed on the raw params: an open-ended range ("up to now") is one cache
+    # entry, refreshed by the TTL / the next stats refresh rather than per request
+    return await cached_response(
+        request,
+        ["profile_stats"],
+        ("profile_stats_history", from_, to, bucket, source),
+        lambda: load_stats_history(start, end, unit, bin_size, source),
+    )
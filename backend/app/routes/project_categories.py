@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Depends
-from app.database import db
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Depends, Request
+from app.database import db, find_public
 from app.models.project_category import ProjectCategoryUpdate
+from app.models.bulk import BulkChange
 from bson import ObjectId
-import os, uuid
+import os
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
+from app.services import category_view, ranking, storage
 
-public_router = APIRouter(prefix="/api/project-categories", tags=["project_categories"])
-admin_router = APIRouter(prefix="/api/project-categories", tags=["project_categories"], dependencies=[Depends(get_current_admin)])
+public_router = APIRouter(prefix="/api/project-categories", tags=["project_categories"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/api/project-categories", tags=["project_categories"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 
 UPLOAD_DIR = "static/uploads/project_categories/"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -20,62 +24,36 @@ async def get_other_category_id():
         result = await db.project_categories.insert_one({
             "name": OTHER_CATEGORY_NAME,
             "description": "Fallback category",
-            "order": 999,
+            "rank": await ranking.rank_for_position(db.project_categories, {}, None),  # last
             "enabled": True
         })
+        await category_view.sync_category(str(result.inserted_id))
+        invalidate("project_categories")
         return str(result.inserted_id)
     return str(other["_id"])
 
 
+async def load_categories():
+    categories = await find_public(db.project_categories, sort=[("rank", 1)])
+    return ranking.with_positions(categories)
+
+
 @public_router.get("/")
-async def get_categories():
-    categories = []
-    async for c in db.project_categories.find({}).sort("order", 1):
-        c["id"] = str(c["_id"])
-        del c["_id"]
-        categories.append(c)
-    return categories
+async def get_categories(request: Request):
+    return await cached_response(request, ["project_categories"], "project_categories", load_categories)
 
 
 @public_router.get("/with-projects")
 async def get_categories_with_projects(
+    request: Request,
     enabled_only: bool = Query(False)
 ):
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "projects",
-                "localField": "_id",
-                "foreignField": "category_id",
-                "as": "projects"
-            }
-        }
-    ]
-
-    if enabled_only:
-        pipeline.insert(0, {"$match": {"enabled": True}})
-        pipeline.append({
-            "$addFields": {
-                "projects": {
-                    "$filter": {
-                        "input": "$projects",
-                        "as": "p",
-                        "cond": {"$eq": ["$$p.enabled", True]}
-                    }
-                }
-            }
-        })
-
-    results = []
-    async for cat in db.project_categories.aggregate(pipeline):
-        cat["id"] = str(cat["_id"])
-        del cat["_id"]
-        for p in cat["projects"]:
-            p["id"] = str(p["_id"])
-            del p["_id"]
-        results.append(cat)
-
-    return results
+    return await cached_response(
+        request,
+        ["project_categories", "projects"],
+        ("project_categories_with_projects", enabled_only),
+        lambda: category_view.load_view(enabled_only),
+    )
 
 
 @admin_router.post("/")
@@ -89,19 +67,18 @@ async def add_category(
     data = {
         "name": name,
         "description": description,
-        "order": order,
+        "rank": await ranking.rank_for_position(db.project_categories, {}, order),
         "enabled": enabled
     }
 
     if image:
-        ext = image.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{ext}"
-        path = os.path.join(UPLOAD_DIR, filename)
-        with open(path, "wb") as f:
-            f.write(await image.read())
-        data["image_link"] = f"/uploads/project_categories/{filename}"
+        data["image_link"], data["image_variants"] = await storage.store_image(
+            image, UPLOAD_DIR, "/uploads/project_categories/"
+        )
 
     result = await db.project_categories.insert_one(data)
+    await category_view.sync_category(str(result.inserted_id))
+    invalidate("project_categories")
     return {"id": str(result.inserted_id)}
 
 
@@ -111,43 +88,54 @@ async def update_category(category_id: str, payload: ProjectCategoryUpdate):
     if not update_data:
         raise HTTPException(400, "No fields to update")
 
+    if "order" in update_data:
+        update_data["rank"] = await ranking.rank_for_position(
+            db.project_categories, {}, update_data.pop("order"), ObjectId(category_id)
+        )
+
     await db.project_categories.update_one(
         {"_id": ObjectId(category_id)},
         {"$set": update_data}
     )
+    await category_view.sync_category(category_id)
+    invalidate("project_categories")
 
     return {"message": "Category updated"}
 
+
+@admin_router.post("/bulk")
+async def bulk_update_categories(changes: list[BulkChange]):
+    if any(c.category is not None for c in changes):
+        raise HTTPException(400, "Categories have no category")
+
+    modified, _ = await ranking.apply_moves(db.project_categories, [c.dict() for c in changes])
+    for c in changes:
+        await category_view.sync_category(c.id)
+    invalidate("project_categories")
+
+    return {"message": "Categories updated", "modified": modified}
+
 @admin_router.delete("/{category_id}")
 async def delete_category(category_id: str):
     category = await db.project_categories.find_one({"_id": ObjectId(category_id)})
     if not category:
         raise HTTPException(404, "Category not found")
 
-    others = await db.project_categories.find_one({"slug": "others"})
-    if not others:
-        raise HTTPException(500, "Others category missing")
-
-    next_order = await db.projects.find(
-        {"category_id": str(others["_id"])}
-    ).sort("order", -1).limit(1).to_list(1)
-
-    start_order = (next_order[0]["order"] + 1) if next_order else 1
+    others_id = await get_other_category_id()
+    if others_id == category_id:
+        raise HTTPException(400, "The fallback category can't be deleted")
 
     projects = await db.projects.find(
-        {"category_id": category_id}
-    ).sort("order", 1).to_list(None)
-
-    for i, p in enumerate(projects):
-        await db.projects.update_one(
-            {"_id": p["_id"]},
-            {
-                "$set": {
-                    "category_id": str(others["_id"]),
-                    "order": start_order + i
-                }
-            }
-        )
+        {"category_id": category_id}, {"_id": 1}
+    ).sort("rank", 1).to_list(None)
+
+    # appended after the Others projects (keeping their relative order), one bulk_write
+    await ranking.apply_moves(
+        db.projects, [{"id": str(p["_id"]), "category": others_id} for p in projects], "category_id"
+    )
 
     await db.project_categories.delete_one({"_id": ObjectId(category_id)})
+    await category_view.remove_category(category_id)
+    await category_view.sync_category(others_id)
+    invalidate("project_categories", "projects")
     return {"message": "Category deleted and projects moved to Others"}
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from app.database import db
-from app.models.project import ProjectUpdate
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from app.database import db, find_public
+from app.models.project import ProjectBase, ProjectUpdate
+from app.models.bulk import BulkChange
 from bson import ObjectId
-import os, uuid
+import os, json, base64
 from fastapi import Depends
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
+from app.services import category_view, ranking, storage
 # added description field to the project model now have to update code accordingly
-public_router = APIRouter(prefix="/api/projects", tags=["projects"])
-admin_router = APIRouter(prefix="/api/projects", tags=["projects"], dependencies=[Depends(get_current_admin)])
+public_router = APIRouter(prefix="/api/projects", tags=["projects"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/api/projects", tags=["projects"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 UPLOAD_DIR = "static/uploads/projects"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -16,57 +20,129 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # Helpers
 # ---------------------------
 
-async def shift_orders(category_id: str, from_order: int):
-    await db.projects.update_many(
-        {
-            "category_id": category_id,
-            "order": {"$gte": from_order}
-        },
-        {"$inc": {"order": 1}}
-    )
+async def rank_at(category_id: str, order: int | None, exclude_id=None) -> str:
+    # order is the 1-based position within the category, None appends
+    return await ranking.rank_for_position(db.projects, {"category_id": category_id}, order, exclude_id)
+
 
+async def save_image(image: UploadFile) -> tuple[str, dict]:
+    return await storage.store_image(image, UPLOAD_DIR, "/uploads/projects/")
 
-async def get_next_order(category_id: str) -> int:
-    last = await db.projects.find(
-        {"category_id": category_id}
-    ).sort("order", -1).limit(1).to_list(1)
 
-    return (last[0]["order"] + 1) if last else 1
+async def delete_image(image_link: str | None, variants: dict | None = None):
+    await storage.release_image(image_link, variants)
 
 
-def save_image(image: UploadFile) -> str:
-    ext = image.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
-    path = os.path.join(UPLOAD_DIR, filename)
+# ---------------------------
+# Routes
+# ---------------------------
 
-    with open(path, "wb") as f:
-        f.write(image.file.read())
+PROJECT_FIELDS = set(ProjectBase.model_fields)
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(project: dict) -> str:
+    # the last row's full sort key: the next page doesn't depend on that row
+    # still existing (or staying where it was)
+    key = [project["category_id"], project["rank"], project["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(after: str) -> dict:
+    try:
+        category_id, rank, last_id = json.loads(base64.urlsafe_b64decode(after.encode()))
+        if not isinstance(category_id, str) or not isinstance(rank, str):
+            raise ValueError
+        last_id = ObjectId(last_id)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+    # keyset over (category_id, rank, _id), matching the sort below
+    return {"$or": [
+        {"category_id": {"$gt": category_id}},
+        {"category_id": category_id, "rank": {"$gt": rank}},
+        {"category_id": category_id, "rank": rank, "_id": {"$gt": last_id}},
+    ]}
+
+
+def parse_fields(fields: str | None) -> dict | None:
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - PROJECT_FIELDS - {"id"}
+    if unknown:
+        raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # category_id / rank are always fetched, they're needed to compute `order`
+    projection = {f: 1 for f in requested - {"id", "order"}}
+    projection.update({"category_id": 1, "rank": 1})
+    return projection
+
+
+async def find_projects(query: dict | None = None, projection: dict | None = None, limit: int | None = None):
+    return await find_public(
+        db.projects,
+        query,
+        sort=[("category_id", 1), ("rank", 1), ("_id", 1)],
+        projection=projection,
+        limit=limit,
+    )
 
-    return f"/uploads/projects/{filename}"
 
+async def with_order(projects: list, partial: bool) -> list:
+    if not partial:
+        return ranking.with_positions(projects, "category_id")
+    # a page / filtered subset: positions come from the full categories
+    positions = await ranking.scope_positions(db.projects, projects, "category_id")
+    return ranking.with_positions(projects, "category_id", positions)
 
-def delete_image(image_link: str | None):
-    if not image_link:
-        return
-    path = "static" + image_link
-    if os.path.exists(path):
-        os.remove(path)
 
+async def load_projects(query: dict | None = None, projection: dict | None = None, limit: int | None = None):
+    projects = await find_projects(query, projection, limit)
+    return await with_order(projects, bool(query or limit))
 
-# ---------------------------
-# Routes
-# ---------------------------
 
 @public_router.get("/")
-async def get_projects():
-    projects = []
-    async for p in db.projects.find({}).sort(
-        [("category_id", 1), ("order", 1)]
-    ):
-        p["id"] = str(p["_id"])
-        del p["_id"]
-        projects.append(p)
-    return projects
+async def get_projects(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None),
+    fields: str | None = Query(None),
+    category_id: str | None = Query(None),
+    enabled: bool | None = Query(None),
+    difficulty: int | None = Query(None, ge=1, le=3),
+    skill: str | None = Query(None),
+):
+    query = {}
+    for field, value in {
+        "category_id": category_id,
+        "enabled": enabled,
+        "difficulty": difficulty,
+        "skills": skill,
+    }.items():
+        if value is not None:
+            query[field] = value
+    if after:
+        query.update(decode_cursor(after))
+
+    projection = parse_fields(fields)
+    cursor_headers = {}
+
+    async def load_page():
+        projects = await find_projects(query, projection, limit)
+        # a full page means there may be more, hand out the cursor for it
+        # (built here, `rank` is replaced by `order` below)
+        if limit and len(projects) == limit:
+            cursor_headers["X-Next-Cursor"] = encode_cursor(projects[-1])
+        return await with_order(projects, bool(query or limit))
+
+    return await cached_response(
+        request,
+        ["projects"],
+        ("projects", limit, after, fields, category_id, enabled, difficulty, skill),
+        load_page,
+        headers_for=lambda _: cursor_headers,
+    )
 
 
 @admin_router.post("/")
@@ -86,16 +162,13 @@ async def add_project(
     if not await db.project_categories.find_one({"_id": ObjectId(category_id)}):
         raise HTTPException(400, "Invalid category")
 
-    if order is None:
-        order = await get_next_order(category_id)
-    else:
-        await shift_orders(category_id, order)
+    rank = await rank_at(category_id, order)
 
     data = {
         "name": name,
         "description": description,
         "category_id": category_id,
-        "order": order,
+        "rank": rank,
         "difficulty": difficulty,
         "date": date,
         "github_url": github_url,
@@ -105,9 +178,11 @@ async def add_project(
     }
 
     if image:
-        data["image_link"] = save_image(image)
+        data["image_link"], data["image_variants"] = await save_image(image)
 
     result = await db.projects.insert_one(data)
+    await category_view.sync_category(category_id)
+    invalidate("projects")
     return {"id": str(result.inserted_id)}
 
 
@@ -119,28 +194,68 @@ async def update_project(project_id: str, payload: ProjectUpdate):
 
     update_data = {k: v for k, v in payload.dict().items() if v is not None}
 
-    if "image" in update_data:
-        delete_image(project.get("image_link"))
-        update_data["image_link"] = save_image(update_data.pop("image"))
-
-    if not update_data:
+    new_image = update_data.pop("image", None)
+    if not update_data and new_image is None:
         raise HTTPException(400, "No fields to update")
 
-    await db.projects.update_one(
-        {"_id": ObjectId(project_id)},
-        {"$set": update_data}
-    )
+    # order / category changes only rewrite this project's rank
+    order = update_data.pop("order", None)
+    new_category = update_data.get("category_id", project["category_id"])
+    if order is not None or new_category != project["category_id"]:
+        update_data["rank"] = await rank_at(new_category, order, project["_id"])
+
+    # new image stored and saved first, the old one released after (a failed upload leaves it intact)
+    if new_image is not None:
+        update_data["image_link"], update_data["image_variants"] = await save_image(new_image)
+    try:
+        await db.projects.update_one(
+            {"_id": ObjectId(project_id)},
+            {"$set": update_data}
+        )
+    except Exception:
+        if new_image is not None:
+            await delete_image(update_data["image_link"], update_data["image_variants"])
+        raise
+    if new_image is not None:
+        await delete_image(project.get("image_link"), project.get("image_variants"))
+    await category_view.sync_category(project["category_id"])
+    if update_data.get("category_id", project["category_id"]) != project["category_id"]:
+        await category_view.sync_category(update_data["category_id"])
+    invalidate("projects")
 
     return {"message": "Project updated"}
 
 
+@admin_router.post("/bulk")
+async def bulk_update_projects(changes: list[BulkChange]):
+    # category = target category_id
+    category_ids = {c.category for c in changes if c.category is not None}
+    if category_ids:
+        if not all(ObjectId.is_valid(c) for c in category_ids):
+            raise HTTPException(400, "Invalid category")
+        found = await db.project_categories.count_documents(
+            {"_id": {"$in": [ObjectId(c) for c in category_ids]}}
+        )
+        if found != len(category_ids):
+            raise HTTPException(400, "Invalid category")
+
+    modified, touched = await ranking.apply_moves(db.projects, [c.dict() for c in changes], "category_id")
+    for category_id in touched:
+        await category_view.sync_category(category_id)
+    invalidate("projects")
+
+    return {"message": "Projects updated", "modified": modified}
+
+
 @admin_router.delete("/{project_id}")
 async def delete_project(project_id: str):
     project = await db.projects.find_one({"_id": ObjectId(project_id)})
     if not project:
         raise HTTPException(404, "Project not found")
 
-    delete_image(project.get("image_link"))
+    await delete_image(project.get("image_link"), project.get("image_variants"))
     await db.projects.delete_one({"_id": ObjectId(project_id)})
+    await category_view.sync_category(project.get("category_id"))
+    invalidate("projects")
 
     return {"message": "Project deleted"}
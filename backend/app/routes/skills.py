@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from app.database import db
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from app.database import db, find_public
 from app.models.skill import SkillCategory
+from app.models.bulk import BulkChange
 from bson import ObjectId
-import os, uuid
+import os
 from fastapi import Depends
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
+from app.services import ranking, storage
 
-public_router = APIRouter(prefix="/api/skills", tags=["skills"])
-admin_router = APIRouter(prefix="/api/skills", tags=["skills"], dependencies=[Depends(get_current_admin)])
+public_router = APIRouter(prefix="/api/skills", tags=["skills"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/api/skills", tags=["skills"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 UPLOAD_DIR = "static/uploads/skills"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -15,57 +19,31 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # Helpers
 # ---------------------------
 
-async def get_next_order(category: str) -> int:
-    last = await db.skills.find(
-        {"category": category}
-    ).sort("order", -1).limit(1).to_list(1)
+async def rank_at(category: str, order: int | None, exclude_id=None) -> str:
+    # order is the 1-based position within the category, None appends
+    return await ranking.rank_for_position(db.skills, {"category": category}, order, exclude_id)
 
-    return (last[0]["order"] + 1) if last else 1
 
+async def save_logo(file: UploadFile) -> tuple[str, dict]:
+    return await storage.store_image(file, UPLOAD_DIR, "/uploads/skills/")
 
-async def shift_orders(category: str, from_order: int):
-    await db.skills.update_many(
-        {
-            "category": category,
-            "order": {"$gte": from_order}
-        },
-        {"$inc": {"order": 1}}
-    )
 
-
-def save_logo(file: UploadFile) -> str:
-    ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
-    path = os.path.join(UPLOAD_DIR, filename)
-
-    with open(path, "wb") as f:
-        f.write(file.file.read())
-
-    return f"/uploads/skills/{filename}"
-
-
-def delete_logo(logo_path: str | None):
-    if not logo_path:
-        return
-    path = "static" + logo_path
-    if os.path.exists(path):
-        os.remove(path)
+async def delete_logo(logo_path: str | None, variants: dict | None = None):
+    await storage.release_image(logo_path, variants)
 
 
 # ---------------------------
 # Routes
 # ---------------------------
 
+async def load_skills():
+    skills = await find_public(db.skills, sort=[("category", 1), ("rank", 1)])
+    return ranking.with_positions(skills, "category")
+
+
 @public_router.get("/")
-async def get_skills():
-    skills = []
-    async for skill in db.skills.find({}).sort(
-        [("category", 1), ("order", 1)]
-    ):
-        skill["id"] = str(skill["_id"])
-        del skill["_id"]
-        skills.append(skill)
-    return skills
+async def get_skills(request: Request):
+    return await cached_response(request, ["skills"], "skills", load_skills)
 
 
 @public_router.get("/categories")
@@ -85,23 +63,22 @@ async def add_skill(
     if await db.skills.find_one({"name": name, "category": category.value}):
         raise HTTPException(400, "Skill already exists in this category")
 
-    if order is None:
-        order = await get_next_order(category.value)
-    else:
-        await shift_orders(category.value, order)
+    rank = await rank_at(category.value, order)
 
-    logo_path = save_logo(logo)
+    logo_path, logo_variants = await save_logo(logo)
 
     skill_data = {
         "name": name,
         "category": category.value,
-        "order": order,
+        "rank": rank,
         "hover_color_primary": hover_color_primary,
         "hover_color_secondary": hover_color_secondary,
-        "logo_path": logo_path
+        "logo_path": logo_path,
+        "logo_variants": logo_variants,
     }
 
     result = await db.skills.insert_one(skill_data)
+    invalidate("skills")
     return {"id": str(result.inserted_id), "message": "Skill added successfully"}
 
 
@@ -123,17 +100,12 @@ async def update_skill(
 
     new_category = category.value if category else skill["category"]
 
-    # 🔁 Handle order change (scoped to category)
-    if order is not None:
-        if order != skill["order"] or new_category != skill["category"]:
-            await shift_orders(new_category, order)
-            update_data["order"] = order
+    # 🔁 Handle order change / category move (scoped to category, only this skill is written)
+    if order is not None or new_category != skill["category"]:
+        update_data["rank"] = await rank_at(new_category, order, skill["_id"])
 
-    # 🔁 Handle category move
     if category is not None:
         update_data["category"] = category.value
-        if order is None:
-            update_data["order"] = await get_next_order(category.value)
 
     for field, value in {
         "name": name,
@@ -143,29 +115,51 @@ async def update_skill(
         if value is not None:
             update_data[field] = value
 
-    # 🖼 Replace logo
+    # 🖼 Replace logo: the new one is stored and saved first, the old one only
+    # released once nothing points at it (a failed upload leaves it intact)
     if logo:
-        delete_logo(skill.get("logo_path"))
-        update_data["logo_path"] = save_logo(logo)
+        update_data["logo_path"], update_data["logo_variants"] = await save_logo(logo)
 
     if not update_data:
         raise HTTPException(400, "No fields to update")
 
-    await db.skills.update_one(
-        {"_id": ObjectId(skill_id)},
-        {"$set": update_data}
-    )
+    try:
+        await db.skills.update_one(
+            {"_id": ObjectId(skill_id)},
+            {"$set": update_data}
+        )
+    except Exception:
+        if logo:
+            await delete_logo(update_data["logo_path"], update_data["logo_variants"])
+        raise
+    if logo:
+        await delete_logo(skill.get("logo_path"), skill.get("logo_variants"))
+    invalidate("skills")
 
     return {"message": "Skill updated successfully"}
 
 
+@admin_router.post("/bulk")
+async def bulk_update_skills(changes: list[BulkChange]):
+    # drag & drop: many {id, order, category} moves, one bulk_write
+    categories = {c.value for c in SkillCategory}
+    if any(c.category is not None and c.category not in categories for c in changes):
+        raise HTTPException(400, "Invalid category")
+
+    modified, _ = await ranking.apply_moves(db.skills, [c.dict() for c in changes], "category")
+    invalidate("skills")
+
+    return {"message": "Skills updated successfully", "modified": modified}
+
+
 @admin_router.delete("/{skill_id}")
 async def delete_skill(skill_id: str):
     skill = await db.skills.find_one({"_id": ObjectId(skill_id)})
     if not skill:
         raise HTTPException(404, "Skill not found")
 
-    delete_logo(skill.get("logo_path"))
+    await delete_logo(skill.get("logo_path"), skill.get("logo_variants"))
     await db.skills.delete_one({"_id": ObjectId(skill_id)})
+    invalidate("skills")
 
     return {"message": "Skill deleted successfully"}
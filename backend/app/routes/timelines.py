@@ -1,23 +1,25 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from app.database import db
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request
+from app.database import db, find_public
 from bson import ObjectId
+from app.models.bulk import BulkChange
 import os
-import uuid
 from app.core.security import get_current_admin
+from app.core.cache import invalidate
+from app.core.responses import cached_response, FastJSONResponse
+from app.services import ranking, storage
 
-public_router = APIRouter(prefix="/api/timelines", tags=["timelines"])
-admin_router = APIRouter(prefix="/api/timelines", tags=["timelines"], dependencies=[Depends(get_current_admin)])
+public_router = APIRouter(prefix="/api/timelines", tags=["timelines"], default_response_class=FastJSONResponse)
+admin_router = APIRouter(prefix="/api/timelines", tags=["timelines"], dependencies=[Depends(get_current_admin)], default_response_class=FastJSONResponse)
 UPLOAD_DIR = "static/uploads/timelines"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+async def load_timelines():
+    timelines = await find_public(db.timelines, sort=[("rank", 1)])
+    return ranking.with_positions(timelines)
+
 @public_router.get("/")
-async def get_timelines():
-    timelines = []
-    async for timeline in db.timelines.find({}).sort("order", 1):
-        timeline["id"] = str(timeline["_id"])
-        del timeline["_id"]
-        timelines.append(timeline)
-    return timelines
+async def get_timelines(request: Request):
+    return await cached_response(request, ["timelines"], "timelines", load_timelines)
 
 @admin_router.post("/")
 async def add_timeline(
@@ -33,30 +35,24 @@ async def add_timeline(
     if existing:
         raise HTTPException(status_code=400, detail="Timeline entry already exists")
 
-    # 🔁 Shift orders >= new order
-    await db.timelines.update_many(
-        {"order": {"$gte": order}},
-        {"$inc": {"order": 1}}
-    )
+    # 🔁 Rank between the neighbours at `order`, nothing else is rewritten
+    rank = await ranking.rank_for_position(db.timelines, {}, order)
 
     # Save image
-    ext = logo.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-
-    with open(file_path, "wb") as f:
-        f.write(await logo.read())
+    logo_path, logo_variants = await storage.store_image(logo, UPLOAD_DIR, "/uploads/timelines/")
 
     timeline_data = {
         "header": header,
         "subheader": subheader,
         "date": date,
         "description": description,
-        "order": order,
-        "logo_path": f"/uploads/timelines/{filename}"
+        "rank": rank,
+        "logo_path": logo_path,
+        "logo_variants": logo_variants,
     }
 
     result = await db.timelines.insert_one(timeline_data)
+    invalidate("timelines")
     return {"id": str(result.inserted_id), "message": "Timeline added successfully"}
 
 @admin_router.put("/{timeline_id}")
@@ -80,39 +76,48 @@ async def update_timeline(
         "subheader": subheader,
         "date": date,
         "description": description,
-        "order": order
     }.items():
         if value is not None:
             update_data[field] = value
 
-    # Replace image if new one uploaded
-    if logo:
-        # delete old image
-        old_path = timeline.get("logo_path")
-        if old_path:
-            old_file = os.path.join("static", old_path.replace("/uploads/", "uploads/"))
-            if os.path.exists(old_file):
-                os.remove(old_file)
-
-        ext = logo.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{ext}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(file_path, "wb") as f:
-            f.write(await logo.read())
+    if order is not None:
+        update_data["rank"] = await ranking.rank_for_position(db.timelines, {}, order, timeline["_id"])
 
-        update_data["logo_path"] = f"/uploads/timelines/{filename}"
+    # Replace image if new one uploaded: stored and saved first, the old one
+    # released after (a failed upload leaves it intact)
+    if logo:
+        update_data["logo_path"], update_data["logo_variants"] = await storage.store_image(
+            logo, UPLOAD_DIR, "/uploads/timelines/"
+        )
 
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    await db.timelines.update_one(
-        {"_id": ObjectId(timeline_id)},
-        {"$set": update_data}
-    )
+    try:
+        await db.timelines.update_one(
+            {"_id": ObjectId(timeline_id)},
+            {"$set": update_data}
+        )
+    except Exception:
+        if logo:
+            await storage.release_image(update_data["logo_path"], update_data["logo_variants"])
+        raise
+    if logo:
+        await storage.release_image(timeline.get("logo_path"), timeline.get("logo_variants"))
+    invalidate("timelines")
 
     return {"message": "Timeline updated successfully"}
 
+@admin_router.post("/bulk")
+async def bulk_update_timelines(changes: list[BulkChange]):
+    if any(c.category is not None for c in changes):
+        raise HTTPException(status_code=400, detail="Timelines have no category")
+
+    modified, _ = await ranking.apply_moves(db.timelines, [c.dict() for c in changes])
+    invalidate("timelines")
+
+    return {"message": "Timelines updated successfully", "modified": modified}
+
 @admin_router.delete("/{timeline_id}")
 async def delete_timeline(timeline_id: str):
     timeline = await db.timelines.find_one({"_id": ObjectId(timeline_id)})
@@ -120,12 +125,9 @@ async def delete_timeline(timeline_id: str):
         raise HTTPException(status_code=404, detail="Timeline not found")
 
     # delete image
-    logo_path = timeline.get("logo_path")
-    if logo_path:
-        file_path = os.path.join("static", logo_path.replace("/uploads/", "uploads/"))
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    await storage.release_image(timeline.get("logo_path"), timeline.get("logo_variants"))
 
     await db.timelines.delete_one({"_id": ObjectId(timeline_id)})
+    invalidate("timelines")
     return {"message": "Timeline deleted successfully"}
 
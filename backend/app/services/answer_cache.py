@@ -0,0 +1,96 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from app.core.cache import cache
+
+# Answers to first-turn chat questions ("what stack do you use?"), keyed by
+# the normalized question. Hits are replayed through the normal streaming
+# path instead of a Gemini round trip.
+# - exact match on the normalized text, plus optional fuzzy match
+#   (token Jaccard >= CHAT_CACHE_SIMILARITY, 0 = off)
+# - LRU (CHAT_CACHE_MAX_ENTRIES) + TTL (CHAT_CACHE_TTL_SECONDS)
+# - stamped with the portfolio content versions: an admin edit or a new
+#   embeddings upload makes every stored answer stale.
+# Only first turns are cached, follow-ups depend on the conversation. Only the
+# answer text is kept: the Gemini interaction it came from holds another
+# visitor's question, so a hit starts the next turn on a fresh interaction.
+
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "256"))
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0"))
+
+CONTENT_COLLECTIONS = (
+    "skills",
+    "timelines",
+    "projects",
+    "project_categories",
+    "profile",
+    "aboutme",
+    "profile_stats",
+    "embeddings",
+)
+REPLAY_CHUNK_SIZE = 64  # characters per replayed token event
+
+_answers: OrderedDict = OrderedDict()  # normalized question -> entry
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(question: str) -> str:
+    return " ".join(_WORD.findall(question.lower()))
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _fresh(entry: dict, versions: tuple) -> bool:
+    return entry["versions"] == versions and time.monotonic() - entry["stored_at"] < CHAT_CACHE_TTL_SECONDS
+
+
+def lookup(question: str) -> dict | None:
+    """{"answer"} for a cached question, or None."""
+    key = normalize(question)
+    versions = cache.versions(CONTENT_COLLECTIONS)
+
+    entry = _answers.get(key)
+    if entry is None and CHAT_CACHE_SIMILARITY > 0:
+        words = set(key.split())
+        best = max(
+            _answers.items(),
+            key=lambda item: _similarity(words, item[1]["words"]),
+            default=None,
+        )
+        if best and _similarity(words, best[1]["words"]) >= CHAT_CACHE_SIMILARITY:
+            key, entry = best
+
+    if entry is None:
+        return None
+    if not _fresh(entry, versions):
+        _answers.pop(key, None)
+        return None
+    _answers.move_to_end(key)
+    return {"answer": entry["answer"]}
+
+
+def store(question: str, answer: str):
+    key = normalize(question)
+    if not key or not answer:
+        return
+    _answers[key] = {
+        "answer": answer,
+        "words": set(key.split()),
+        "versions": cache.versions(CONTENT_COLLECTIONS),
+        "stored_at": time.monotonic(),
+    }
+    _answers.move_to_end(key)
+    while len(_answers) > CHAT_CACHE_MAX_ENTRIES:
+        _answers.popitem(last=False)
+
+
+async def replay(hit: dict):
+    """Same events as astream_gemini_response, for a cached answer (no interaction to continue)."""
+    answer = hit["answer"]
+    for i in range(0, len(answer), REPLAY_CHUNK_SIZE):
+        yield ("token", answer[i:i + REPLAY_CHUNK_SIZE])
+    yield ("done", None, answer)
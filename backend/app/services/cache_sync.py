@@ -0,0 +1,61 @@
+import asyncio
+import os
+from pymongo import ReturnDocument
+from app.database import db
+from app.core.cache import cache
+
+# Cross-worker cache invalidation.
+# cache.invalidate() only bumps this process's versions. Every worker pushes
+# its bumps to db.cache_versions (one counter per name) and applies the
+# counters other workers moved, every CACHE_SYNC_SECONDS. An admin write, or a
+# stats refresh done by whichever worker held the lease, reaches every
+# worker's cache (and ETags) within about one interval.
+
+CACHE_SYNC_SECONDS = float(os.getenv("CACHE_SYNC_SECONDS", "2"))
+
+_seen: dict = {}  # name -> shared counter already applied here
+_synced = False
+
+
+async def publish():
+    names = cache.take_unpublished()
+    try:
+        for name in names:
+            doc = await db.cache_versions.find_one_and_update(
+                {"_id": name},
+                {"$inc": {"v": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            # our own bump is already applied; if another worker's landed in
+            # between, leave it for the poll to pick up
+            if doc["v"] == _seen.get(name, 0) + 1:
+                _seen[name] = doc["v"]
+    except Exception:
+        cache.requeue_unpublished(names)
+        raise
+
+
+async def sync():
+    global _synced
+    await publish()
+
+    changed = []
+    async for doc in db.cache_versions.find({}):
+        if _seen.get(doc["_id"]) != doc["v"]:
+            _seen[doc["_id"]] = doc["v"]
+            changed.append(doc["_id"])
+    # the first poll only records where the counters are
+    if changed and _synced:
+        cache.invalidate(*changed, publish=False)
+    _synced = True
+
+
+async def run_sync():
+    """Runs for the app's lifetime (started from the lifespan in main.py)."""
+    while True:
+        try:
+            await sync()
+        except Exception as e:
+            print("Cache sync error:", e)
+        await asyncio.sleep(CACHE_SYNC_SECONDS)
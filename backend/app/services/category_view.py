@@ -0,0 +1,57 @@
+from bson import ObjectId
+from app.database import db, find_public
+from app.services import ranking
+
+# Materialized "categories with projects" view.
+# One document per category in db.project_category_views, holding the category
+# fields plus its projects (already id-converted, sorted by rank, with their `order` position).
+# Project / category writes re-sync only the categories they touched, so the
+# public endpoint is a single indexed read instead of a $lookup per request.
+
+
+async def sync_category(category_id: str | None):
+    if not category_id or not ObjectId.is_valid(category_id):
+        return
+
+    category = await db.project_categories.find_one({"_id": ObjectId(category_id)})
+    if not category:
+        await remove_category(category_id)
+        return
+
+    projects = await find_public(
+        db.projects, {"category_id": category_id}, sort=[("rank", 1)]
+    )
+    category["projects"] = ranking.with_positions(projects)
+    await db.project_category_views.replace_one(
+        {"_id": category["_id"]}, category, upsert=True
+    )
+
+
+async def remove_category(category_id: str):
+    await db.project_category_views.delete_one({"_id": ObjectId(category_id)})
+
+
+async def rebuild_all():
+    """Full rebuild, run once at startup to pick up writes made outside the API."""
+    ids = []
+    async for c in db.project_categories.find({}, {"_id": 1}):
+        ids.append(c["_id"])
+        await sync_category(str(c["_id"]))
+
+    await db.project_category_views.delete_many({"_id": {"$nin": ids}})
+
+
+async def load_view(enabled_only: bool = False):
+    query = {"enabled": True} if enabled_only else {}
+    results = await find_public(db.project_category_views, query, sort=[("rank", 1)])
+    # positions among all categories, also when only the enabled ones are returned
+    positions = None
+    if enabled_only:
+        ranks = await db.project_categories.find({}, {"_id": 0, "rank": 1}).sort("rank", 1).to_list(None)
+        positions = {(None, c.get("rank")): i for i, c in enumerate(ranks, 1)}
+    ranking.with_positions(results, positions=positions)
+
+    if enabled_only:
+        for cat in results:
+            cat["projects"] = [p for p in cat["projects"] if p.get("enabled")]
+    return results
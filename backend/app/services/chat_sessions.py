@@ -0,0 +1,93 @@
+import asyncio
+import os
+from datetime import datetime
+from pymongo import UpdateOne
+from app.database import db
+
+# Chat session persistence.
+# An exchange is appended with one atomic $push/$each/$slice (the last
+# HISTORY_LIMIT messages are kept by Mongo), never read-modify-written.
+# With CHAT_WRITE_BEHIND=true the appends are buffered per session and flushed
+# every CHAT_FLUSH_SECONDS as one bulk_write; the buffer is also flushed on
+# shutdown (a crash loses at most one interval).
+
+HISTORY_LIMIT = 20
+WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "false").lower() == "true"
+FLUSH_INTERVAL_SECONDS = float(os.getenv("CHAT_FLUSH_SECONDS", "2"))
+MAX_PENDING_SESSIONS = 500  # flush early past this many buffered sessions
+RECENT_MESSAGES = 6  # kept per connection, to seed a fresh Gemini interaction
+
+_pending: dict = {}  # chat_id -> {"messages": [...], "set": {...}}
+
+
+def message(role: str, text: str) -> dict:
+    return {"role": role, "message": text, "timestamp": datetime.utcnow()}
+
+
+async def get_session(chat_id: str) -> dict:
+    """
+    {"interaction_id", "recent"}: the Gemini interaction to continue from (None
+    after a cached answer) and the last RECENT_MESSAGES messages. Called once
+    per connection and chat.
+    """
+    session = await db.chat_sessions.find_one(
+        {"_id": chat_id}, {"gemini_chat_id": 1, "chatHistory": {"$slice": -RECENT_MESSAGES}}
+    ) or {}
+    interaction_id = session.get("gemini_chat_id")
+    recent = session.get("chatHistory", [])
+    if chat_id in _pending:  # not flushed yet
+        interaction_id = _pending[chat_id]["set"].get("gemini_chat_id", interaction_id)
+        recent = recent + _pending[chat_id]["messages"]
+    return {"interaction_id": interaction_id, "recent": recent[-RECENT_MESSAGES:]}
+
+
+def _update(messages: list, fields: dict) -> dict:
+    return {
+        "$push": {"chatHistory": {"$each": messages, "$slice": -HISTORY_LIMIT}},
+        "$set": fields,
+    }
+
+
+async def append_exchange(chat_id: str, messages: list, interaction_id: str | None):
+    fields = {"gemini_chat_id": interaction_id, "updated_at": datetime.utcnow()}
+
+    if not WRITE_BEHIND:
+        await db.chat_sessions.update_one({"_id": chat_id}, _update(messages, fields), upsert=True)
+        return
+
+    entry = _pending.setdefault(chat_id, {"messages": [], "set": {}})
+    entry["messages"].extend(messages)
+    entry["messages"] = entry["messages"][-HISTORY_LIMIT:]
+    entry["set"].update(fields)
+    if len(_pending) >= MAX_PENDING_SESSIONS:
+        await flush()
+
+
+async def flush():
+    global _pending
+    batch, _pending = _pending, {}
+    if not batch:
+        return
+
+    ops = [
+        UpdateOne({"_id": chat_id}, _update(entry["messages"], entry["set"]), upsert=True)
+        for chat_id, entry in batch.items()
+    ]
+    try:
+        await db.chat_sessions.bulk_write(ops, ordered=False)
+    except Exception as e:
+        print("Chat session flush error:", e)
+        # put them back in front of anything buffered meanwhile, retried next flush
+        for chat_id, entry in batch.items():
+            newer = _pending.get(chat_id)
+            if newer:
+                entry["messages"] = (entry["messages"] + newer["messages"])[-HISTORY_LIMIT:]
+                entry["set"].update(newer["set"])
+            _pending[chat_id] = entry
+
+
+async def run_flusher():
+    """Runs for the app's lifetime when WRITE_BEHIND is on (started from main.py)."""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        await flush()
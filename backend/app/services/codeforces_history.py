@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError
+from app.database import db
+
+# Codeforces rating history, one document per (handle, contest) in
+# db.codeforces_rating_history instead of an array rewritten on every refresh.
+# user.rating has no "since" parameter, so the list is still downloaded, but
+# only contests newer than the last stored one are converted and inserted.
+
+
+def rating_point(r: dict) -> dict:
+    """One user.rating entry as a graph point."""
+    return {
+        "contestId": r["contestId"],
+        "contestName": r["contestName"],
+        "rating": r["newRating"],
+        "rank": r["rank"],
+        "date": datetime.fromtimestamp(
+            r["ratingUpdateTimeSeconds"], tz=timezone.utc
+        ).strftime("%Y-%m-%d"),
+    }
+
+
+async def sync_history(handle: str, rating_data: list) -> int:
+    """Insert the contests newer than the latest stored one. Returns how many were new."""
+    last = await db.codeforces_rating_history.find_one(
+        {"handle": handle}, {"ratingUpdateTimeSeconds": 1},
+        sort=[("ratingUpdateTimeSeconds", DESCENDING)],
+    )
+    last_time = last["ratingUpdateTimeSeconds"] if last else -1
+
+    # user.rating is oldest first: walk back from the end until a known contest
+    new = []
+    for r in reversed(rating_data):
+        if r["ratingUpdateTimeSeconds"] <= last_time:
+            break
+        new.append({
+            "handle": handle,
+            "ratingUpdateTimeSeconds": r["ratingUpdateTimeSeconds"],
+            **rating_point(r),
+        })
+    if not new:
+        return 0
+
+    try:
+        await db.codeforces_rating_history.insert_many(new[::-1], ordered=False)
+    except BulkWriteError as e:  # another worker stored some of them already
+        return e.details.get("nInserted", 0)
+    return len(new)
+
+
+async def load_history(handle: str) -> list:
+    """The graph-ready ratingHistory list (oldest first)."""
+    return await db.codeforces_rating_history.find(
+        {"handle": handle},
+        {"_id": 0, "contestId": 1, "contestName": 1, "rating": 1, "rank": 1, "date": 1},
+    ).sort("ratingUpdateTimeSeconds", 1).to_list(None)
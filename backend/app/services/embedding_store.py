@@ -0,0 +1,152 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+import numpy as np
+
+# Binary embeddings file (.emb), read through mmap so every uvicorn worker
+# shares the same page-cache copy and opening it costs the same whatever the
+# corpus size (nothing is parsed or copied up front).
+#
+#   header   HEADER below, padded to HEADER_SIZE
+#   matrix   count x dims, float32 or float16, little-endian, rows L2-normalized
+#   offsets  count + 1 uint64, passage i is text[offsets[i]:offsets[i + 1]]
+#   text     utf-8 passages back to back
+#
+# Sections start on ALIGN boundaries. Files are written to a temp name and
+# renamed into place, so readers either see the old file or the complete new one.
+
+MAGIC = b"PFEMBED\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIQQQ")  # magic, version, dtype, count, dims, matrix/offsets/text offsets
+HEADER_SIZE = 64
+ALIGN = 64
+DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+DTYPE_CODES = {"float32": 1, "float16": 2}
+EXTENSION = ".emb"
+
+
+class EmbeddingFormatError(ValueError):
+    pass
+
+
+def _aligned(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def read_records(path: str, name: str | None = None):
+    """{"text", "embedding"} records from a .jsonl (streamed) or .json list file (by name, default path)."""
+    with open(path, "r", encoding="utf-8") as f:
+        if (name or path).endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def write(records, path: str, dtype: str = "float32") -> int:
+    """
+    Write records as a .emb file at path (atomically). Rows and texts are
+    spooled to temp files first, so memory stays flat for any corpus size.
+    Returns the number of passages.
+    """
+    code = DTYPE_CODES[dtype]
+    directory = os.path.dirname(path) or "."
+    count = dims = 0
+    text_size = 0
+    offsets = [0]
+
+    with tempfile.TemporaryFile(dir=directory) as rows, tempfile.TemporaryFile(dir=directory) as texts:
+        for record in records:
+            if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+                raise EmbeddingFormatError(f"record {count}: expected an object with a string \"text\"")
+            vector = np.asarray(record["embedding"], dtype=np.float32)
+            if count == 0:
+                dims = vector.size
+            elif vector.size != dims:
+                raise EmbeddingFormatError(f"record {count}: {vector.size} dimensions, expected {dims}")
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            rows.write(vector.astype(DTYPES[code]).tobytes())
+
+            text = record["text"].encode("utf-8")
+            texts.write(text)
+            text_size += len(text)
+            offsets.append(text_size)
+            count += 1
+
+        matrix_offset = HEADER_SIZE
+        offsets_offset = _aligned(matrix_offset + count * dims * DTYPES[code].itemsize)
+        text_offset = _aligned(offsets_offset + 8 * len(offsets))
+
+        tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as out:
+                out.write(HEADER.pack(MAGIC, VERSION, code, count, dims, matrix_offset, offsets_offset, text_offset))
+                for section, offset in ((rows, matrix_offset), (None, offsets_offset), (texts, text_offset)):
+                    out.write(b"\0" * (offset - out.tell()))
+                    if section is None:
+                        out.write(np.asarray(offsets, dtype="<u8").tobytes())
+                    else:
+                        section.seek(0)
+                        shutil.copyfileobj(section, out)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp_path, path)  # the swap: readers see old or new, never partial
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return count
+
+
+class EmbeddingFile:
+    """A .emb file mapped read-only. matrix / offsets are views on the mapping (no copy)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise EmbeddingFormatError("file too small")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, code, count, dims, matrix_offset, offsets_offset, text_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or code not in DTYPES:
+            raise EmbeddingFormatError("not an embeddings file")
+        # sections in order, none overlapping the next one or running past the end
+        if not (
+            HEADER_SIZE <= matrix_offset
+            and matrix_offset + count * dims * DTYPES[code].itemsize <= offsets_offset
+            and offsets_offset + 8 * (count + 1) <= text_offset <= size
+        ):
+            raise EmbeddingFormatError("bad section layout")
+
+        self.count, self.dims = count, dims
+        self.matrix = np.frombuffer(self._map, DTYPES[code], count * dims, matrix_offset).reshape(count, dims)
+        self.offsets = np.frombuffer(self._map, "<u8", count + 1, offsets_offset)
+        self._text_offset = text_offset
+
+        # offset table: 8 bytes per passage, cheap next to the matrix
+        if self.offsets[0] != 0 or np.any(self.offsets[1:] < self.offsets[:-1]):
+            raise EmbeddingFormatError("offsets out of order")
+        if text_offset + int(self.offsets[-1]) > size:
+            raise EmbeddingFormatError("passage text runs past the end")
+
+    def passage(self, i: int) -> str:
+        start = self._text_offset + int(self.offsets[i])
+        end = self._text_offset + int(self.offsets[i + 1])
+        # validate() rejects broken text at upload, a file swapped in by hand can't break a search
+        return self._map[start:end].decode("utf-8", errors="replace")
+
+
+def validate(path: str):
+    """Raises EmbeddingFormatError unless path is a readable .emb file, every passage included."""
+    f = EmbeddingFile(path)
+    for i in range(f.count):
+        start = f._text_offset + int(f.offsets[i])
+        try:
+            f._map[start:f._text_offset + int(f.offsets[i + 1])].decode("utf-8")
+        except UnicodeDecodeError:
+            raise EmbeddingFormatError(f"passage {i} is not valid utf-8")
@@ -0,0 +1,83 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+
+# Resized modern-format variants for uploaded images.
+# Generated once at upload time in a process pool (Pillow is CPU bound and
+# would otherwise block the event loop) and exposed next to the original as a
+# srcset-style map: {"webp": {"320w": url, "640w": url}, "avif": {...}}
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = tuple(f for f in ("avif", "webp") if features.check(f))
+VARIANT_QUALITY = {"webp": 80, "avif": 60}
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _make_variants(path: str) -> dict:
+    """Runs in a worker process. Returns {format: {"<w>w": file_name}}."""
+    base = os.path.splitext(path)[0]
+    variants = {}
+
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+        for fmt in VARIANT_FORMATS:
+            variants[fmt] = {}
+            for width in VARIANT_WIDTHS:
+                width = min(width, img.width)  # never upscale
+                resized = img
+                if width < img.width:
+                    height = max(1, round(img.height * width / img.width))
+                    resized = img.resize((width, height), Image.LANCZOS)
+
+                out = f"{base}-{width}.{fmt}"
+                resized.save(out, fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                variants[fmt][f"{width}w"] = os.path.basename(out)
+                if width == img.width:
+                    break
+
+    return variants
+
+
+async def create_variants(file_path: str, url: str) -> dict:
+    """
+    Generate variants for the image stored at file_path (served as url).
+    Returns the srcset-style map of variant urls, or {} if the file isn't an image
+    Pillow can read (e.g. svg logos).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        names = await loop.run_in_executor(_get_pool(), _make_variants, file_path)
+    except Exception as e:
+        print("Image variant error:", e)
+        return {}
+
+    url_dir = url[: len(url) - len(os.path.basename(file_path))]  # keeps url's own separators
+    return {
+        fmt: {w: url_dir + name for w, name in sizes.items()}
+        for fmt, sizes in names.items()
+    }
+
+
+def variant_urls(variants: dict | None):
+    for sizes in (variants or {}).values():
+        yield from sizes.values()
@@ -1,9 +1,27 @@
 from google import genai
+from google.genai import types
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import threading
 
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 MODEL = "gemini-3-flash-preview"
+EMBED_MODEL = os.getenv("GEMINI_EMBED_MODEL", "gemini-embedding-001")
+
+# The SDK stream is blocking, so it's consumed in a dedicated thread pool and
+# handed to the event loop through a bounded queue (astream_gemini_response).
+# One slow chat then only occupies its own thread, never the event loop.
+STREAM_WORKERS = int(os.getenv("GEMINI_STREAM_WORKERS", "32"))
+STREAM_QUEUE_SIZE = 64  # events buffered per stream before the thread waits
+
+_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="gemini-stream")
+_END = object()
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
 
 
 def stream_gemini_response(user_message: str, previous_interaction_id: str | None):
@@ -29,3 +47,56 @@ def stream_gemini_response(user_message: str, previous_interaction_id: str | Non
         elif chunk.event_type == "interaction.complete":
             interaction_id = chunk.interaction.id
             yield ("done", interaction_id, full_response)
+
+
+async def astream_gemini_response(user_message: str, previous_interaction_id: str | None):
+    """
+    Async version of stream_gemini_response, same events.
+    Stopping early (client gone) tells the worker thread to drop the stream.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    slots = threading.Semaphore(STREAM_QUEUE_SIZE)  # bounds the queue, blocks the thread not the loop
+    cancelled = threading.Event()
+
+    def send(item) -> bool:
+        while not slots.acquire(timeout=0.5):
+            if cancelled.is_set():
+                return False
+        loop.call_soon_threadsafe(events.put_nowait, item)
+        return True
+
+    def produce():
+        try:
+            for event in stream_gemini_response(user_message, previous_interaction_id):
+                if cancelled.is_set() or not send(event):
+                    return
+            send(_END)
+        except Exception as e:
+            send(e)
+
+    loop.run_in_executor(_executor, produce)
+    try:
+        while True:
+            item = await events.get()
+            slots.release()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+def embed_query(text: str, dimensions: int | None = None) -> list[float]:
+    result = client.models.embed_content(
+        model=EMBED_MODEL,
+        contents=text,
+        config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=dimensions),
+    )
+    return result.embeddings[0].values
+
+
+async def aembed_query(text: str, dimensions: int | None = None) -> list[float]:
+    return await asyncio.get_running_loop().run_in_executor(_executor, embed_query, text, dimensions)
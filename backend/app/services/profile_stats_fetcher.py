@@ -1,18 +1,45 @@
-import requests
+import asyncio
+import httpx
 from datetime import datetime, timezone
-from github import Github
 import os
 from collections import defaultdict
 from datetime import timedelta
+from app.database import db
+from app.services import codeforces_history
+
+
+# -------- Shared async client --------
+# One pooled keep-alive client for every async fetcher, so repeated refreshes
+# reuse connections (TLS handshakes) instead of opening new ones per request.
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={"User-Agent": "portfolio-stats"},
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 # -------- LeetCode --------
-def fetch_leetcode(username: str):
-    url = f"https://leetcode-stats-api.herokuapp.com/{username}"
-    r = requests.get(url, timeout=10)
+async def fetch_leetcode_async(username: str):
+    r = await get_client().get(f"https://leetcode-stats-api.herokuapp.com/{username}")
     r.raise_for_status()
-    data = r.json()
+    return leetcode_summary(username, r.json())
+
 
+def leetcode_summary(username: str, data: dict):
     return {
         "username": username,
         "totalSolved": data.get("totalSolved", 0),
@@ -22,33 +49,23 @@ def fetch_leetcode(username: str):
     }
 
 
-def fetch_codeforces(username: str):
-    user_url = f"https://codeforces.com/api/user.info?handles={username}"
-    rating_url = f"https://codeforces.com/api/user.rating?handle={username}"
-
-    user_resp = requests.get(user_url, timeout=10)
+async def fetch_codeforces_async(username: str):
+    client = get_client()
+    user_resp, rating_resp = await asyncio.gather(
+        client.get("https://codeforces.com/api/user.info", params={"handles": username}),
+        client.get("https://codeforces.com/api/user.rating", params={"handle": username}),
+    )
     user_resp.raise_for_status()
     user_info = user_resp.json()["result"][0]
 
-    rating_resp = requests.get(rating_url, timeout=10)
-    rating_data = rating_resp.json().get("result", []) if rating_resp.ok else []
+    summary = codeforces_summary(username, user_info)
+    # history lives in its own collection (see codeforces_history), only new contests are written
+    if rating_resp.is_success:
+        await codeforces_history.sync_history(summary["username"], rating_resp.json().get("result", []))
+    return summary
 
-    history = sorted(
-        [
-            {
-                "contestId": r["contestId"],
-                "contestName": r["contestName"],
-                "rating": r["newRating"],
-                "rank": r["rank"],
-                "date": datetime.fromtimestamp(
-                    r["ratingUpdateTimeSeconds"], tz=timezone.utc
-                ).strftime("%Y-%m-%d"),
-            }
-            for r in rating_data
-        ],
-        key=lambda x: x["date"],
-    )
 
+def codeforces_summary(username: str, user_info: dict):
     return {
         "username": user_info["handle"],
         "rating": user_info.get("rating", "Unrated"),
@@ -56,85 +73,153 @@ def fetch_codeforces(username: str):
         "rank": user_info.get("rank", "Unknown"),
         "profile": f"https://codeforces.com/profile/{username}",
         "avatar_url": user_info.get("titlePhoto", ""),
-        "ratingHistory": history,  # 👈 graph-ready
     }
 
 
-def fetch_github(username: str):
-    token = os.getenv("GITHUB_TOKEN")
-
-    # ---------- AUTHENTICATED ----------
-    if token:
-        g = Github(token)
-        user = g.get_user(username)
-        repos = user.get_repos()
-
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-
-        summary = {
-            "username": user.login,
-            "avatar_url": user.avatar_url,
-            "public_repos": [],
-            "total_commits_last_30_days": 0,
-            "top_languages": defaultdict(int),
-            "auth_used": True,
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Repos, their languages and the default branch's commit count since a date,
+# 100 repos per query - a handful of queries instead of 2 REST calls per repo.
+GITHUB_QUERY = """
+query($login: String!, $since: GitTimestamp!, $cursor: String) {
+  user(login: $login) {
+    login
+    avatarUrl
+    repositories(first: 100, after: $cursor, privacy: PUBLIC, isFork: false, ownerAffiliations: OWNER) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        url
+        primaryLanguage { name }
+        languages(first: 50, orderBy: {field: SIZE, direction: DESC}) {
+          edges { size node { name } }
         }
+        defaultBranchRef {
+          target { ... on Commit { history(since: $since) { totalCount } } }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def github_variables(username: str, cursor: str | None = None) -> dict:
+    since = datetime.now(timezone.utc) - timedelta(days=30)
+    return {"login": username, "since": since.strftime("%Y-%m-%dT%H:%M:%SZ"), "cursor": cursor}
+
 
-        for repo in repos:
-            if repo.fork:
-                continue
+def github_page(payload: dict) -> dict:
+    if payload.get("errors"):
+        raise RuntimeError(payload["errors"][0].get("message", "GitHub GraphQL error"))
+    return payload["data"]["user"]
 
+
+def github_summary(pages: list):
+    user = pages[0]
+    summary = {
+        "username": user["login"],
+        "avatar_url": user["avatarUrl"],
+        "public_repos": [],
+        "total_commits_last_30_days": 0,
+        "top_languages": defaultdict(int),
+        "auth_used": True,
+    }
+
+    for page in pages:
+        for repo in page["repositories"]["nodes"]:
             summary["public_repos"].append({
-                "name": repo.name,
-                "url": repo.html_url,
-                "language": repo.language,
+                "name": repo["name"],
+                "url": repo["url"],
+                "language": (repo["primaryLanguage"] or {}).get("name"),
             })
 
-            try:
-                summary["total_commits_last_30_days"] += repo.get_commits(
-                    since=thirty_days_ago
-                ).totalCount
-            except:
-                pass
-
-            try:
-                for lang, bytes_count in repo.get_languages().items():
-                    summary["top_languages"][lang] += bytes_count
-            except:
-                pass
-
-        summary["top_languages"] = dict(
-            sorted(summary["top_languages"].items(), key=lambda x: x[1], reverse=True)
-        )
+            target = (repo["defaultBranchRef"] or {}).get("target") or {}
+            summary["total_commits_last_30_days"] += target.get("history", {}).get("totalCount", 0)
 
-        return summary
+            for edge in repo["languages"]["edges"]:
+                summary["top_languages"][edge["node"]["name"]] += edge["size"]
 
-    # ---------- PUBLIC FALLBACK ----------
-    else:
-        user_resp = requests.get(
-            f"https://api.github.com/users/{username}", timeout=10
-        )
-        user_resp.raise_for_status()
-        user_data = user_resp.json()
+    summary["top_languages"] = dict(
+        sorted(summary["top_languages"].items(), key=lambda x: x[1], reverse=True)
+    )
+    return summary
+
+
+async def conditional_get(url: str, params: dict | None = None, headers: dict | None = None):
+    """
+    GET with a stored ETag (db.http_cache): unchanged resources come back as an
+    empty 304 - which GitHub doesn't count against the rate limit - and the
+    stored body is reused. Returns the decoded json body.
+    """
+    key = str(httpx.URL(url, params=params))
+    cached = await db.http_cache.find_one({"_id": key})
+    request_headers = dict(headers or {})
+    if cached and cached.get("etag"):
+        request_headers["If-None-Match"] = cached["etag"]
+
+    r = await get_client().get(url, params=params, headers=request_headers)
+    if r.status_code == 304 and cached:
+        return cached["body"]
+    r.raise_for_status()
 
-        repos_resp = requests.get(
-            f"https://api.github.com/users/{username}/repos?per_page=100",
-            timeout=10,
+    body = r.json()
+    if r.headers.get("etag"):
+        await db.http_cache.replace_one(
+            {"_id": key},
+            {"etag": r.headers["etag"], "body": body, "fetched_at": datetime.now(timezone.utc)},
+            upsert=True,
         )
-        repos = repos_resp.json() if repos_resp.ok else []
-
-        return {
-            "username": user_data["login"],
-            "avatar_url": user_data["avatar_url"],
-            "public_repos": [
-                {
-                    "name": r["name"],
-                    "url": r["html_url"],
-                    "language": r["language"],
-                }
-                for r in repos if not r["fork"]
-            ],
-            "total_commits_last_30_days": None,  # ❗ unavailable
-            "top_languages": {},                 # ❗ unreliable
-            "auth_used": False,
-        }
+    return body
+
+
+async def fetch_github_async(username: str):
+    token = os.getenv("GITHUB_TOKEN")
+    client = get_client()
+
+    if token:
+        pages = []
+        cursor = None
+        while True:
+            r = await client.post(
+                GITHUB_GRAPHQL_URL,
+                json={"query": GITHUB_QUERY, "variables": github_variables(username, cursor)},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            r.raise_for_status()
+            page = github_page(r.json())
+            pages.append(page)
+            info = page["repositories"]["pageInfo"]
+            if not info["hasNextPage"]:
+                return github_summary(pages)
+            cursor = info["endCursor"]
+
+    user_data, repos = await asyncio.gather(
+        conditional_get(f"https://api.github.com/users/{username}"),
+        conditional_get(f"https://api.github.com/users/{username}/repos", params={"per_page": 100}),
+        return_exceptions=True,
+    )
+    if isinstance(user_data, BaseException):
+        raise user_data
+    if isinstance(repos, BaseException):
+        repos = []
+
+    return github_public_summary(user_data, repos)
+
+
+def github_public_summary(user_data: dict, repos: list):
+    return {
+        "username": user_data["login"],
+        "avatar_url": user_data["avatar_url"],
+        "public_repos": [
+            {
+                "name": r["name"],
+                "url": r["html_url"],
+                "language": r["language"],
+            }
+            for r in repos if not r["fork"]
+        ],
+        "total_commits_last_30_days": None,  # ❗ unavailable
+        "top_languages": {},                 # ❗ unreliable
+        "auth_used": False,
+    }
@@ -0,0 +1,306 @@
+import asyncio
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from app.core.cache import invalidate
+from app.database import bulk_write
+
+# Fractional ("lexicographic rank") ordering.
+# Every ordered document stores a `rank` string; sorting by rank gives the
+# display order. Inserting or moving an item picks a key strictly between its
+# new neighbours, so exactly one document is written instead of shifting every
+# later `order` with update_many. Read APIs still present an integer `order`,
+# computed from the position in the sorted list.
+#
+# Keys use base-62 digits and never end in the lowest digit, so there is always
+# room for a key between any two others. They only grow when the same gap is
+# split over and over; past MAX_RANK_LENGTH the scope is rebalanced in the
+# background (fresh, evenly spread keys).
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+MAX_RANK_LENGTH = 12
+
+_rebalancing: dict = {}  # (collection, scope) -> asyncio.Task
+
+# materialized views holding copies of a collection's documents (same _id,
+# see category_view): their ranks follow every rank write made here
+RANK_MIRRORS = {"project_categories": "project_category_views"}
+
+
+def _digit(key: str, i: int) -> int:
+    return DIGITS.index(key[i]) if i < len(key) else 0
+
+
+def key_between(lo: str | None, hi: str | None, even: bool = False) -> str:
+    """
+    A key strictly between lo and hi (None = open end).
+    Appends / prepends step by a single digit rather than halving the open
+    range, which keeps keys short for the common "add at the end" case;
+    even=True always takes the midpoint.
+    """
+    step_up = hi is None and lo is not None and not even
+    step_down = lo is None and hi is not None and not even
+    lo = lo or ""
+    if hi is not None and lo >= hi:
+        raise ValueError(f"rank {lo!r} is not below {hi!r}")
+
+    prefix = ""
+    i = 0
+    while True:
+        d_lo = _digit(lo, i)
+        d_hi = _digit(hi, i) if hi is not None else BASE
+        if d_lo == d_hi:
+            prefix += DIGITS[d_lo]
+            i += 1
+            continue
+
+        mid = (d_lo + d_hi) // 2
+        if step_up and d_lo + 1 < d_hi:
+            mid = d_lo + 1
+        elif step_down and d_hi - 1 > d_lo:
+            mid = d_hi - 1
+        if mid > d_lo:
+            return prefix + DIGITS[mid]
+
+        # adjacent digits: keep lo's digit, anything after it is already < hi
+        prefix += DIGITS[d_lo]
+        hi = None
+        i += 1
+
+
+def keys_between(lo: str | None, hi: str | None, n: int) -> list[str]:
+    """n increasing keys between lo and hi, split evenly to keep them short."""
+    if n <= 0:
+        return []
+    mid = key_between(lo, hi, even=True)
+    left = (n - 1) // 2
+    return keys_between(lo, mid, left) + [mid] + keys_between(mid, hi, n - 1 - left)
+
+
+async def mirror_ranks(collection, ranks: dict):
+    """Copy _id -> rank into the collection's materialized view, if it has one."""
+    mirror = RANK_MIRRORS.get(collection.name)
+    if not mirror or not ranks:
+        return
+    await collection.database[mirror].bulk_write(
+        [UpdateOne({"_id": _id}, {"$set": {"rank": key}}) for _id, key in ranks.items()], ordered=False
+    )
+    invalidate(collection.name)
+
+
+async def rebalance(collection, scope: dict):
+    """Give every document in scope a fresh, evenly spread rank (keeps the order)."""
+    docs = await collection.find(scope, {"_id": 1}).sort([("rank", 1), ("_id", 1)]).to_list(None)
+    ranks = {d["_id"]: key for d, key in zip(docs, keys_between(None, None, len(docs)))}
+    ops = [UpdateOne({"_id": _id}, {"$set": {"rank": key}, "$unset": {"order": ""}}) for _id, key in ranks.items()]
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        await mirror_ranks(collection, ranks)
+
+
+def schedule_rebalance(collection, scope: dict):
+    task_key = (collection.name, tuple(sorted(scope.items())))
+    if task_key in _rebalancing:
+        return
+
+    async def run():
+        try:
+            await rebalance(collection, scope)
+        except Exception as e:
+            print("Rank rebalance error:", e)
+        finally:
+            _rebalancing.pop(task_key, None)
+
+    _rebalancing[task_key] = asyncio.get_running_loop().create_task(run())
+
+
+async def rank_for_position(collection, scope: dict, position: int | None, exclude_id=None) -> str:
+    """
+    Rank that puts a document at 1-based `position` within scope
+    (None / past the end = append). exclude_id is the document being moved.
+    """
+    query = dict(scope)
+    if exclude_id is not None:
+        query["_id"] = {"$ne": exclude_id}
+    sort = [("rank", 1), ("_id", 1)]
+
+    for _ in range(2):
+        lo = hi = None
+        if position is not None and position <= 1:
+            first = await collection.find(query, {"rank": 1}).sort(sort).limit(1).to_list(1)
+            hi = first[0]["rank"] if first else None
+        else:
+            neighbours = []
+            if position is not None:
+                neighbours = await collection.find(query, {"rank": 1}).sort(sort).skip(position - 2).limit(2).to_list(2)
+            if neighbours:
+                lo = neighbours[0]["rank"]
+                hi = neighbours[1]["rank"] if len(neighbours) > 1 else None
+            else:
+                last = await collection.find(query, {"rank": 1}).sort([("rank", -1), ("_id", -1)]).limit(1).to_list(1)
+                lo = last[0]["rank"] if last else None
+
+        if lo is None or hi is None or lo < hi:
+            break
+        # two documents share a rank (concurrent inserts), spread them out and retry
+        await rebalance(collection, scope)
+
+    key = key_between(lo, hi)
+    if len(key) > MAX_RANK_LENGTH:
+        schedule_rebalance(collection, scope)
+    return key
+
+
+def _fill_runs(entries: list) -> dict:
+    """
+    entries: (rank, _id) in final order, rank None for moved documents.
+    Each run of moved documents gets evenly spread keys between the ranks of
+    the unmoved neighbours around it. Returns {_id: rank}.
+    """
+    ranks = {}
+    i = 0
+    while i < len(entries):
+        if entries[i][0] is not None:
+            i += 1
+            continue
+        j = i
+        while j < len(entries) and entries[j][0] is None:
+            j += 1
+        lo = entries[i - 1][0] if i else None
+        hi = entries[j][0] if j < len(entries) else None
+        for (_, _id), key in zip(entries[i:j], keys_between(lo, hi, j - i)):
+            ranks[_id] = key
+        i = j
+    return ranks
+
+
+async def apply_moves(collection, changes: list, scope_field: str | None = None) -> tuple[int, set]:
+    """
+    Apply a batch of {id, order, category} changes with a single bulk_write.
+    order is the final 1-based position in the target scope, category (the
+    scope_field value) moves the document to another scope - appended when no
+    order is given. Only the moved documents are written.
+    Returns (modified count, scopes touched).
+    """
+    try:
+        ids = [ObjectId(c["id"]) for c in changes]
+    except Exception:
+        raise HTTPException(400, "Invalid id")
+    if len(set(ids)) != len(ids):
+        raise HTTPException(400, "Duplicate ids")
+
+    projection = {"rank": 1, scope_field: 1} if scope_field else {"rank": 1}
+    current = {d["_id"]: d async for d in collection.find({"_id": {"$in": ids}}, projection)}
+    missing = [str(i) for i in ids if i not in current]
+    if missing:
+        raise HTTPException(404, f"Not found: {', '.join(missing)}")
+
+    targets = {}  # target scope -> [(position, _id)]
+    touched = set()
+    for _id, change in zip(ids, changes):
+        old = current[_id].get(scope_field) if scope_field else None
+        new = old if change.get("category") is None else change["category"]
+        if change.get("order") is None and new == old:
+            continue
+        touched.update({old, new})
+        targets.setdefault(new, []).append((change.get("order"), _id))
+
+    moved = [_id for placed in targets.values() for _, _id in placed]
+    ops = []
+    written = {}
+    for scope, placed in targets.items():
+        query = {scope_field: scope} if scope_field else {}
+        query["_id"] = {"$nin": moved}
+        anchors = await collection.find(query, {"rank": 1}).sort([("rank", 1), ("_id", 1)]).to_list(None)
+
+        entries = [(d.get("rank"), d["_id"]) for d in anchors]
+        # lowest position first so every document ends up where it asked to be,
+        # documents without a position are appended in request order
+        for position, _id in sorted(placed, key=lambda p: (p[0] is None, p[0] or 0)):
+            if position is None:
+                entries.append((None, _id))
+            else:
+                entries.insert(min(position - 1, len(entries)), (None, _id))
+
+        try:
+            ranks = _fill_runs(entries)
+        except ValueError:
+            # neighbours share a rank (concurrent inserts): re-key the whole scope
+            ranks = dict(zip((_id for _, _id in entries), keys_between(None, None, len(entries))))
+
+        extra = {scope_field: scope} if scope_field else {}
+        ops += [
+            UpdateOne({"_id": _id}, {"$set": {"rank": key, **extra}})
+            for _id, key in ranks.items()
+        ]
+        written.update(ranks)
+
+    modified = await bulk_write(collection, ops)
+    # the whole scope may have been re-keyed, not just the moved documents
+    await mirror_ranks(collection, written)
+    return modified, touched
+
+
+async def ensure_ranks(collection, scope_field: str | None = None):
+    """
+    One-off migration from integer `order`: every scope containing documents
+    without a rank is re-keyed. Ranked documents keep their relative order,
+    unranked ones follow sorted by their old `order`.
+    """
+    if scope_field:
+        scopes = await collection.distinct(scope_field, {"rank": {"$exists": False}})
+        scopes = [{scope_field: s} for s in scopes]
+    else:
+        missing = await collection.find_one({"rank": {"$exists": False}}, {"_id": 1})
+        scopes = [{}] if missing else []
+
+    for scope in scopes:
+        docs = await collection.find(scope, {"_id": 1, "rank": 1, "order": 1}).to_list(None)
+        docs.sort(key=lambda d: (
+            "rank" not in d,
+            d.get("rank", ""),
+            d.get("order") if isinstance(d.get("order"), int) else 0,
+            d["_id"],
+        ))
+        ops = [
+            UpdateOne({"_id": d["_id"]}, {"$set": {"rank": key}, "$unset": {"order": ""}})
+            for d, key in zip(docs, keys_between(None, None, len(docs)))
+        ]
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+
+
+def with_positions(docs: list, scope_field: str | None = None, positions: dict | None = None) -> list:
+    """
+    Replace the internal `rank` with the integer `order` the API exposes.
+    docs must be sorted by (scope_field, rank) and contain every document of
+    their scope - otherwise pass positions from scope_positions().
+    """
+    counters = {}
+    for d in docs:
+        scope = d.get(scope_field) if scope_field else None
+        if positions is not None:
+            d["order"] = positions.get((scope, d.get("rank")))
+        else:
+            counters[scope] = counters.get(scope, 0) + 1
+            d["order"] = counters[scope]
+        d.pop("rank", None)
+    return docs
+
+
+async def scope_positions(collection, docs: list, scope_field: str) -> dict:
+    """(scope, rank) -> 1-based position, for a partial list (page / filter) of docs."""
+    scopes = list({d.get(scope_field) for d in docs})
+    if not scopes:
+        return {}
+
+    positions = {}
+    counters = {}
+    async for d in collection.find(
+        {scope_field: {"$in": scopes}}, {"_id": 0, scope_field: 1, "rank": 1}
+    ).sort([(scope_field, 1), ("rank", 1)]):
+        scope = d.get(scope_field)
+        counters[scope] = counters.get(scope, 0) + 1
+        positions[(scope, d.get("rank"))] = counters[scope]
+    return positions
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from app.database import db
+from app.core.cache import invalidate
+from app.services.profile_stats_fetcher import (
+    fetch_leetcode_async,
+    fetch_codeforces_async,
+    fetch_github_async,
+)
+
+# Background refresh of db.profile_stats.
+# Every source has its own interval (+ jitter so workers / restarts don't sync
+# up) and backs off exponentially while it keeps failing. A lease document per
+# source in db.stats_refresh makes sure only one worker refreshes it at a time,
+# the others just skip. Reads never wait: stale data is served and a refresh is
+# kicked off in the background (stale-while-revalidate). The worker that did
+# the refresh invalidates "profile_stats"; cache_sync carries that to the others.
+
+# Every successful refresh also appends the source's numeric metrics to the
+# db.profile_stats_history time-series collection (for trend graphs).
+
+HOUR = 60 * 60
+
+
+def _numbers(value: dict, *keys) -> dict:
+    return {
+        k: value[k] for k in keys
+        if isinstance(value.get(k), (int, float)) and not isinstance(value.get(k), bool)
+    }
+
+
+STATS_SOURCES = {
+    "leetcode": {
+        "fetch": fetch_leetcode_async, "username": "gkg11092002", "timeout": 10, "interval": 6 * HOUR,
+        "metrics": lambda v: _numbers(v, "totalSolved", "easySolved", "mediumSolved", "hardSolved"),
+    },
+    "codeforces": {
+        "fetch": fetch_codeforces_async, "username": "Gaurav_KG", "timeout": 10, "interval": 6 * HOUR,
+        "metrics": lambda v: _numbers(v, "rating", "maxRating"),  # "Unrated" is skipped
+    },
+    "github": {
+        "fetch": fetch_github_async, "username": "CodingWeeb-Gaurav", "timeout": 30, "interval": 3 * HOUR,
+        "metrics": lambda v: {
+            **_numbers(v, "total_commits_last_30_days"),
+            "public_repos": len(v.get("public_repos") or []),
+        },
+    },
+}
+
+JITTER = 0.1  # +-10% of the interval
+BACKOFF_BASE_SECONDS = 60
+LEASE_SECONDS = 120  # longer than any source timeout
+MAX_SLEEP_SECONDS = 300
+REVALIDATE_CHECK_SECONDS = 30  # how often reads look at the schedule
+SCHEDULER_ENABLED = os.getenv("STATS_SCHEDULER", "true").lower() != "false"
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_running: dict = {}  # source -> asyncio.Task
+_checked_at = 0.0
+
+
+def _jittered(seconds: float) -> timedelta:
+    return timedelta(seconds=seconds * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+async def acquire_lease(name: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        await db.stats_refresh.find_one_and_update(
+            {
+                "_id": name,
+                "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}],
+            },
+            {"$set": {"lease_owner": WORKER_ID, "lease_until": now + timedelta(seconds=LEASE_SECONDS)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:  # document exists and the lease is held elsewhere
+        return False
+    return True
+
+
+async def refresh_source(name: str) -> bool:
+    """Fetch one source if its lease can be taken. Returns whether it was refreshed."""
+    if not await acquire_lease(name):
+        return False
+
+    source = STATS_SOURCES[name]
+    state = await db.stats_refresh.find_one({"_id": name}) or {}
+    try:
+        value = await asyncio.wait_for(source["fetch"](source["username"]), source["timeout"])
+    except Exception as e:
+        failures = state.get("failures", 0) + 1
+        delay = min(source["interval"], BACKOFF_BASE_SECONDS * 2 ** (failures - 1))
+        print(f"{name} stats error (attempt {failures}):", repr(e))
+        await db.stats_refresh.update_one(
+            {"_id": name, "lease_owner": WORKER_ID},
+            {"$set": {
+                "failures": failures,
+                "next_run_at": datetime.utcnow() + _jittered(delay),
+                "lease_until": None,
+            }},
+        )
+        return False
+
+    now = datetime.utcnow()
+    await db.profile_stats.update_one(
+        {"_id": "stats"},
+        {"$set": {name: value, "last_updated": now}},
+        upsert=True,
+    )
+    await db.profile_stats_history.insert_one(
+        {"ts": now, "source": name, "metrics": source["metrics"](value)}
+    )
+    await db.stats_refresh.update_one(
+        {"_id": name, "lease_owner": WORKER_ID},
+        {"$set": {
+            "failures": 0,
+            "refreshed_at": now,
+            "next_run_at": now + _jittered(source["interval"]),
+            "lease_until": None,
+        }},
+    )
+    invalidate("profile_stats")
+    return True
+
+
+def refresh_in_background(name: str):
+    if name in _running:
+        return
+    task = asyncio.get_running_loop().create_task(refresh_source(name))
+    _running[name] = task
+    task.add_done_callback(lambda _: _running.pop(name, None))
+
+
+async def refresh_profile_stats():
+    """Refresh every source now, concurrently (slowest source = total time)."""
+    await asyncio.gather(*(refresh_source(name) for name in STATS_SOURCES))
+
+
+async def due_sources() -> tuple[list, datetime | None]:
+    """Sources whose next run has come, plus the earliest upcoming run."""
+    now = datetime.utcnow()
+    states = {s["_id"]: s async for s in db.stats_refresh.find({"_id": {"$in": list(STATS_SOURCES)}})}
+
+    due, upcoming = [], None
+    for name in STATS_SOURCES:
+        next_run = states.get(name, {}).get("next_run_at")
+        if next_run is None or next_run <= now:
+            due.append(name)
+        elif upcoming is None or next_run < upcoming:
+            upcoming = next_run
+    return due, upcoming
+
+
+async def revalidate():
+    """Called on reads: kick off refreshes for stale sources, at most every REVALIDATE_CHECK_SECONDS."""
+    global _checked_at
+    now = time.monotonic()
+    if now - _checked_at < REVALIDATE_CHECK_SECONDS:
+        return
+    _checked_at = now
+
+    due, _ = await due_sources()
+    for name in due:
+        refresh_in_background(name)
+
+
+async def run_scheduler():
+    """Runs for the app's lifetime (started from the lifespan in main.py)."""
+    while True:
+        try:
+            due, upcoming = await due_sources()
+            await asyncio.gather(*(refresh_source(name) for name in due))
+            # sources leased by another worker stay due, check back after the lease
+            sleep = MAX_SLEEP_SECONDS
+            if upcoming is not None:
+                sleep = min(sleep, (upcoming - datetime.utcnow()).total_seconds())
+            if due:
+                sleep = min(sleep, LEASE_SECONDS)
+        except Exception as e:
+            print("Stats scheduler error:", e)
+            sleep = BACKOFF_BASE_SECONDS
+        await asyncio.sleep(max(sleep, 1))
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import uuid
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReturnDocument
+from app.database import db
+from app.services import images
+
+# Storage for uploaded files. Images are content-addressed:
+# files are named after the sha256 of their bytes, so identical uploads are
+# stored (and get their variants generated) once, and a hashed url never
+# changes content - /static serves those with immutable cache headers
+# (see app/core/static_files.py).
+# db.static_files keeps a reference count per url so a shared file is only
+# deleted when the last document using it lets go.
+#
+# Uploads are copied to a temp file in fixed-size chunks (never read whole
+# into memory), size-capped per type and atomically renamed into place.
+# The cap limits what is kept, not what is received: the multipart parser
+# has already spooled the whole body to disk before a handler runs.
+
+MB = 1024 * 1024
+CHUNK_SIZE = 1 * MB
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_UPLOAD_MB", "10")) * MB
+MAX_EMBEDDINGS_SIZE = int(os.getenv("MAX_EMBEDDINGS_UPLOAD_MB", "512")) * MB
+
+
+def url_to_path(url: str) -> str:
+    # "/uploads/..." urls live under static/, profile image urls are already paths
+    if url.startswith("/uploads/"):
+        return "static" + url
+    return url.replace("/", os.sep)
+
+
+def _remove_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _write_chunk(f, digest, chunk: bytes):
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def stream_to_temp(file: UploadFile, directory: str, max_bytes: int) -> tuple[str, str]:
+    """
+    Stream an upload into a temp file inside directory, CHUNK_SIZE bytes at a
+    time, hashing and writing in a worker thread. Returns (tmp_path, sha256).
+    Raises 413 (and removes the temp file) once max_bytes is exceeded.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(413, f"File too large (max {max_bytes // MB} MB)")
+
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+
+    f = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(413, f"File too large (max {max_bytes // MB} MB)")
+            await run_in_threadpool(_write_chunk, f, digest, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(_remove_files, [tmp_path])
+        raise
+    await run_in_threadpool(f.close)
+
+    return tmp_path, digest.hexdigest()
+
+
+async def store_image(file: UploadFile, directory: str, url_prefix: str) -> tuple[str, dict]:
+    """Save an uploaded image under its content hash. Returns (url, variants)."""
+    tmp_path, digest = await stream_to_temp(file, directory, MAX_IMAGE_SIZE)
+    ext = file.filename.split(".")[-1].lower()
+    filename = f"{digest}.{ext}"
+    path = os.path.join(directory, filename)
+    url = url_prefix + filename
+
+    record = await db.static_files.find_one_and_update(
+        {"_id": url},
+        {"$inc": {"refs": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # referenced first, then put in place: same bytes, so replacing an existing
+    # file is harmless, and it brings back one a concurrent release just removed
+    await run_in_threadpool(os.replace, tmp_path, path)
+
+    variants = record.get("variants")
+    if variants is None:  # first time we see these bytes
+        variants = await images.create_variants(path, url)
+        await db.static_files.update_one({"_id": url}, {"$set": {"variants": variants}})
+
+    return url, variants
+
+
+async def release_image(url: str | None, variants: dict | None = None):
+    """Drop one reference to url; the file and its variants go with the last one."""
+    if not url:
+        return
+
+    record = await db.static_files.find_one_and_update(
+        {"_id": url},
+        {"$inc": {"refs": -1}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+    if record is None:
+        # uploaded before content addressing, owned by a single document
+        await run_in_threadpool(
+            _remove_files, [url_to_path(u) for u in [url, *images.variant_urls(variants)]]
+        )
+        return
+
+    if record["refs"] > 0:
+        return
+    # only if nobody took a new reference in the meantime (a parallel upload
+    # of the same bytes), otherwise its files stay
+    record = await db.static_files.find_one_and_delete({"_id": url, "refs": {"$lte": 0}})
+    if record is not None:
+        urls = [url, *images.variant_urls(record.get("variants"))]
+        await run_in_threadpool(_remove_files, [url_to_path(u) for u in urls])
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from app.services import embedding_store, llm_gemini
+
+# In-memory vector index over the files in static/profile/embeddings, used to
+# ground chat answers (retrieval-augmented prompts), no external vector DB.
+#
+# Files: .emb (embedding_store's binary format, what uploads are converted
+# to), or legacy .json (a list) / .jsonl (one object per line) of
+#   {"text": "<passage>", "embedding": [float, ...]}
+# Every file is one segment with L2-normalized rows, so a search is a
+# matrix-vector product (cosine) + argpartition per segment. .emb segments
+# are mmapped: nothing is read up front and the pages are shared by all
+# workers; only legacy files are parsed into memory.
+# Segments are (re)opened when their file changes (mtime / size / inode):
+# immediately after an admin PUT / DELETE, and otherwise picked up by a check
+# at most every CHECK_INTERVAL_SECONDS (other workers, manual edits). A
+# search that's running keeps its old mapping, a replaced file stays readable
+# until it's dropped.
+
+EMBED_DIR = "static/profile/embeddings"
+TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", "0.3"))
+CHECK_INTERVAL_SECONDS = 5.0
+BLOCK_ROWS = 16384  # float16 rows upcast per step (numpy has no float16 BLAS)
+EXTENSIONS = (embedding_store.EXTENSION, ".json", ".jsonl")
+
+
+class _JsonSegment:
+    def __init__(self, path: str):
+        texts, vectors = [], []
+        for record in embedding_store.read_records(path):
+            if vectors and len(record["embedding"]) != len(vectors[0]):
+                print(f"Embeddings: skipping {path} record, dimension mismatch")
+                continue
+            texts.append(record["text"])
+            vectors.append(record["embedding"])
+
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), len(vectors[0]) if vectors else 0)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.matrix, self.texts = matrix, texts
+        self.count, self.dims = matrix.shape
+
+    def passage(self, i: int) -> str:
+        return self.texts[i]
+
+
+def _open_segment(path: str):
+    if path.endswith(embedding_store.EXTENSION):
+        return embedding_store.EmbeddingFile(path)
+    return _JsonSegment(path)
+
+
+def _scores(matrix: np.ndarray, q: np.ndarray) -> np.ndarray:
+    if matrix.dtype == np.float32:
+        return matrix @ q
+    return np.concatenate([
+        matrix[i:i + BLOCK_ROWS].astype(np.float32) @ q for i in range(0, len(matrix), BLOCK_ROWS)
+    ])
+
+
+class VectorIndex:
+    def __init__(self):
+        self.segments: tuple = ()
+        self.key = None
+        self.checked_at = 0.0
+        self._open: dict = {}  # file name -> (stat key, segment), reused while unchanged
+        self._lock = threading.Lock()
+
+    @property
+    def dimensions(self) -> int:
+        return self.segments[0].dims if self.segments else 0
+
+    def _files_key(self):
+        if not os.path.isdir(EMBED_DIR):
+            return ()
+        key = []
+        for name in sorted(os.listdir(EMBED_DIR)):
+            if name.endswith(EXTENSIONS) and not name.startswith("."):
+                st = os.stat(os.path.join(EMBED_DIR, name))
+                key.append((name, st.st_mtime_ns, st.st_size, st.st_ino))
+        return tuple(key)
+
+    def load(self, force: bool = False):
+        """Open new / changed files, drop removed ones. Runs in a worker thread."""
+        with self._lock:
+            key = self._files_key()
+            self.checked_at = time.monotonic()
+            if key == self.key and not force:
+                return
+
+            opened, segments = {}, []
+            for entry in key:
+                name = entry[0]
+                previous = self._open.get(name)
+                if previous and previous[0] == entry:
+                    segment = previous[1]
+                else:
+                    try:
+                        segment = _open_segment(os.path.join(EMBED_DIR, name))
+                    except Exception as e:
+                        print(f"Embeddings: can't read {name}:", e)
+                        continue
+                opened[name] = (entry, segment)
+
+                if segment.count == 0:
+                    continue
+                if segments and segment.dims != segments[0].dims:
+                    print(f"Embeddings: skipping {name}, dimension mismatch")
+                    continue
+                segments.append(segment)
+
+            # one assignment, searches see the old or the new set of segments
+            self.segments, self.key, self._open = tuple(segments), key, opened
+
+    def search(self, query: list[float], k: int = TOP_K) -> list[tuple[float, str]]:
+        q = np.asarray(query, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        hits = []
+        for segment in self.segments:
+            scores = _scores(segment.matrix, q)
+            n = min(k, len(scores))
+            top = np.argpartition(-scores, n - 1)[:n]
+            hits.extend((float(scores[i]), segment, int(i)) for i in top)
+
+        hits.sort(key=lambda hit: -hit[0])
+        # passage text is only read for the hits
+        return [(score, segment.passage(i)) for score, segment, i in hits[:k]]
+
+
+index = VectorIndex()
+
+
+async def reload():
+    await run_in_threadpool(index.load, True)
+
+
+async def ensure_loaded():
+    if time.monotonic() - index.checked_at >= CHECK_INTERVAL_SECONDS:
+        await run_in_threadpool(index.load)
+
+
+async def retrieve(question: str, k: int = TOP_K) -> list[str]:
+    await ensure_loaded()
+    if not index.segments:
+        return []
+    try:
+        query = await llm_gemini.aembed_query(question, index.dimensions)
+    except Exception as e:
+        print("Embedding error:", e)
+        return []
+    if len(query) != index.dimensions:
+        print("Embedding error: query dimension doesn't match the index")
+        return []
+    try:
+        # off the loop: page faults on a cold mmap read from disk
+        hits = await run_in_threadpool(index.search, query, k)
+    except Exception as e:
+        print("Vector search error:", e)
+        return []
+    return [text for score, text in hits if score >= MIN_SCORE]
+
+
+def build_prompt(question: str, passages: list[str], earlier: list | None = None) -> str:
+    """earlier: chat_sessions messages the Gemini interaction hasn't seen (a cached answer)."""
+    if not passages and not earlier:
+        return question
+    parts = ["Answer the visitor's question about this portfolio. Use the context "
+             "below when it is relevant; don't mention that you were given context."]
+    if passages:
+        context = "\n\n".join(f"[{i}] {p}" for i, p in enumerate(passages, 1))
+        parts.append(f"Context:\n{context}")
+    if earlier:
+        speaker = {"user": "Visitor", "ai": "You"}
+        lines = "\n".join(f"{speaker.get(m['role'], m['role'])}: {m['message']}" for m in earlier)
+        parts.append(f"Conversation so far:\n{lines}")
+    parts.append(f"Question: {question}")
+    return "\n\n".join(parts)
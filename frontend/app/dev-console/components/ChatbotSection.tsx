@@ -27,8 +27,8 @@ export default function ChatbotSection({ requireAuth, toast }: Props) {
         setLoading(true);
         try {
             const fd = new FormData(); fd.append("file", embedFile);
-            await apiFormRequest("/profile/embeddings", "PUT", fd);
-            setEmbedFile(null); toast("Embeddings uploaded!", "success");
+            const res = await apiFormRequest("/profile/embeddings", "PUT", fd);
+            setEmbedFile(null); toast(`Embeddings uploaded as ${res.filename}`, "success");
         } catch (e) { toast(e instanceof Error ? e.message : "Failed", "error"); }
         finally { setLoading(false); }
     }
@@ -65,10 +65,10 @@ export default function ChatbotSection({ requireAuth, toast }: Props) {
             {/* Embeddings */}
             <div className="card">
                 <div className="card-title"><span>📦</span> Profile Embeddings</div>
-                <p style={{ fontSize: "0.84rem", color: "var(--text-dim)", marginBottom: 14 }}>Upload an embeddings file (.pkl / .json / .npy etc.) for the AI chatbot to use.</p>
+                <p style={{ fontSize: "0.84rem", color: "var(--text-dim)", marginBottom: 14 }}>Upload an embeddings file (.json / .jsonl records with "text" and "embedding", or .emb) for the AI chatbot to use. JSON files are stored as .emb.</p>
                 <div className="form-group">
                     <label className="form-label">Upload Embeddings File</label>
-                    <input className="form-input" type="file" onChange={e => setEmbedFile(e.target.files?.[0] || null)} />
+                    <input className="form-input" type="file" accept=".json,.jsonl,.emb" onChange={e => setEmbedFile(e.target.files?.[0] || null)} />
                 </div>
                 <button className="btn btn-success" disabled={loading || !embedFile} onClick={() => requireAuth(uploadEmbeddings)}>
                     {loading ? "Uploading…" : "⬆ Upload"}
@@ -78,7 +78,7 @@ export default function ChatbotSection({ requireAuth, toast }: Props) {
             <div className="card">
                 <div className="card-title"><span>🗑</span> Delete Embeddings File</div>
                 <div className="inline-pair">
-                    <input className="form-input" placeholder="filename.pkl" value={deleteFilename} onChange={e => setDeleteFilename(e.target.value)} />
+                    <input className="form-input" placeholder="filename.emb" value={deleteFilename} onChange={e => setDeleteFilename(e.target.value)} />
                     <button className="btn btn-danger" disabled={loading} onClick={() => requireAuth(deleteEmbeddings)}>Delete</button>
                 </div>
             </div>
@@ -31,7 +31,29 @@ async function fetchAndStore(key: StorageKey, endpoint: string) {
     }
 }
 
+// keys of the /api/portfolio bootstrap document
+const PORTFOLIO_KEYS: Record<string, StorageKey> = {
+    skills: "skills",
+    projects: "projects",
+    project_categories: "projectCategories",
+    timelines: "timelines",
+    profile_data: "profileData",
+    aboutme: "aboutMe",
+    profile_image: "profileImage",
+    profile_stats: "profileStats",
+};
+
 export async function fetchAllData() {
+    try {
+        // one request for the whole portfolio instead of one per section
+        const snapshot = await apiRequest("/api/portfolio");
+        for (const [field, key] of Object.entries(PORTFOLIO_KEYS)) {
+            localStorage.setItem(STORAGE_KEYS[key], JSON.stringify(snapshot[field] ?? null));
+        }
+        return;
+    } catch (e) {
+        console.error("Failed to fetch /api/portfolio, falling back to per-section requests:", e);
+    }
     return Promise.allSettled([
         fetchAndStore("skills", "/api/skills/"),
         fetchAndStore("projects", "/api/projects/"),